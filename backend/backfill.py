@@ -0,0 +1,107 @@
+# backfill.py
+import sqlite3
+import threading
+import time
+
+from telethon.errors import TakeoutInitDelayError
+
+
+class BackfillCheckpoints:
+    # Last processed message id per (account, link), so an interrupted backfill resumes
+    def __init__(self, path):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS backfills ("
+            "account TEXT NOT NULL, link TEXT NOT NULL, last_id INTEGER NOT NULL DEFAULT 0, "
+            "processed INTEGER NOT NULL DEFAULT 0, status TEXT NOT NULL, error TEXT, "
+            "updated_at REAL NOT NULL, PRIMARY KEY (account, link))"
+        )
+        # A row left 'running' belongs to a process that died mid-run; it resumes on request
+        self._db.execute("UPDATE backfills SET status = 'interrupted' WHERE status = 'running'")
+        self._db.commit()
+
+    def claim(self, account, link):
+        # Mark a backfill as running unless one already is; False means refuse the new run
+        with self._lock:
+            cursor = self._db.execute(
+                "INSERT INTO backfills (account, link, status, updated_at) VALUES (?, ?, 'running', ?) "
+                "ON CONFLICT (account, link) DO UPDATE SET status = 'running', error = NULL, "
+                "updated_at = excluded.updated_at WHERE status != 'running'",
+                (account, link, time.time()),
+            )
+            self._db.commit()
+        return cursor.rowcount > 0
+
+    def release(self, account, link, status, error=None):
+        # End a claimed run that stopped before run_backfill took over its checkpoint
+        with self._lock:
+            self._db.execute(
+                "UPDATE backfills SET status = ?, error = ?, updated_at = ? WHERE account = ? AND link = ?",
+                (status, error, time.time(), account, link),
+            )
+            self._db.commit()
+
+    def get(self, account, link):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT last_id, processed, status FROM backfills WHERE account = ? AND link = ?",
+                (account, link),
+            ).fetchone()
+        return {"last_id": row[0], "processed": row[1], "status": row[2]} if row else None
+
+    def save(self, account, link, last_id, processed, status, error=None):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO backfills (account, link, last_id, processed, status, error, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (account, link, last_id, processed, status, error, time.time()),
+            )
+            self._db.commit()
+
+    def all(self):
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT account, link, last_id, processed, status, error, updated_at FROM backfills "
+                "ORDER BY updated_at DESC"
+            ).fetchall()
+        keys = ("account", "link", "last_id", "processed", "status", "error", "updated_at")
+        return [dict(zip(keys, row)) for row in rows]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+async def run_backfill(account, link, peer, checkpoints, process_chunk, chunk_size=500):
+    # Page through a group's whole history, oldest first, inside a takeout session
+    # (relaxed flood limits). process_chunk(messages) is awaited for every chunk and
+    # the checkpoint advances only after it succeeds.
+    state = checkpoints.get(account.name, link) or {"last_id": 0, "processed": 0}
+    last_id, processed = state["last_id"], state["processed"]
+    checkpoints.save(account.name, link, last_id, processed, "running")
+
+    async def flush(chunk):
+        nonlocal last_id, processed
+        await process_chunk(chunk)
+        last_id, processed = chunk[-1].id, processed + len(chunk)
+        checkpoints.save(account.name, link, last_id, processed, "running")
+
+    try:
+        async with account.client.takeout(finalize=True, channels=True, megagroups=True, chats=True) as takeout:
+            chunk = []
+            async for msg in takeout.iter_messages(peer, reverse=True, min_id=last_id, wait_time=0):
+                chunk.append(msg)
+                if len(chunk) >= chunk_size:
+                    await flush(chunk)
+                    chunk = []
+            if chunk:
+                await flush(chunk)
+    except TakeoutInitDelayError as e:
+        checkpoints.save(account.name, link, last_id, processed, "waiting", f"takeout allowed in {e.seconds}s")
+        raise
+    except Exception as e:
+        checkpoints.save(account.name, link, last_id, processed, "interrupted", str(e))
+        raise
+    checkpoints.save(account.name, link, last_id, processed, "done")
+    return processed
@@ -0,0 +1,46 @@
+# bench_extract.py
+# Compares the streaming t.me extractor with the old BeautifulSoup-based one.
+# Usage (from backend/): python bench/bench_extract.py [page.html ...]
+import glob
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup
+
+from links import extract_telegram_links
+
+legacy_telegram_regex = re.compile(
+    r"(https?://t\.me/(joinchat/)?(\+?[a-zA-Z0-9_-]{5,})|https?://t\.me/c/\d+/[0-9]+)"
+)
+
+
+def legacy_extract(page):
+    links = []
+    soup = BeautifulSoup(page.decode("utf-8", "ignore"), "html.parser")
+    text = soup.get_text(" ", strip=True)
+    links.extend(m[0] for m in legacy_telegram_regex.findall(text))
+    for a in soup.find_all("a", href=True):
+        if "t.me" in a["href"]:
+            links.append(a["href"])
+    return list(set(links))
+
+
+def main(paths, repeat=5):
+    for path in paths:
+        with open(path, "rb") as f:
+            page = f.read()
+        legacy = min(timeit.repeat(lambda: legacy_extract(page), number=1, repeat=repeat))
+        streaming = min(timeit.repeat(lambda: extract_telegram_links(page), number=1, repeat=repeat))
+        print(f"{os.path.basename(path)} ({len(page) // 1024} KiB)")
+        print(f"  beautifulsoup: {legacy * 1000:8.2f} ms  {len(legacy_extract(page))} links")
+        print(f"  streaming:     {streaming * 1000:8.2f} ms  {len(extract_telegram_links(page))} links")
+        print(f"  speedup:       {legacy / streaming:8.1f}x")
+
+
+if __name__ == "__main__":
+    fixtures = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "*.html")
+    main(sys.argv[1:] or sorted(glob.glob(fixtures)))
@@ -0,0 +1,68 @@
+# bench_matcher.py
+# Compares the per-keyword substring filter with the compiled KeywordMatcher over a
+# synthetic message corpus.
+# Usage (from backend/): python bench/bench_matcher.py [messages]
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import matcher
+from matcher import KeywordMatcher
+
+KEYWORDS = [
+    "buy", "sell", "target", "stock", "intraday", "call", "tip", "signal",
+    "profit", "loss", "broker", "registered", "SEBI", "investment", "trade",
+    "alerts", "trading", "equity", "nifty", "sensex", "shares"
+]
+
+CHATTER = (
+    "good morning everyone please recall that the meeting moved to friday we will share "
+    "the photos from the trip later thanks for joining the group have a nice day see you "
+    "soon anyone watching the match tonight happy birthday bro the link is in the bio"
+).split()
+
+
+def corpus(n, seed=7):
+    # ~10% of messages carry a keyword, the rest is chatter with near-misses ("recall")
+    rng = random.Random(seed)
+    messages = []
+    for _ in range(n):
+        words = rng.choices(CHATTER, k=rng.randint(6, 30))
+        if rng.random() < 0.1:
+            words.insert(rng.randrange(len(words)), rng.choice(KEYWORDS).upper())
+        messages.append(" ".join(words))
+    return messages
+
+
+def legacy_filter(messages):
+    return [msg for msg in messages if any(kw.lower() in msg.lower() for kw in KEYWORDS)]
+
+
+def timed(fn, messages):
+    start = time.perf_counter()
+    flagged = fn(messages)
+    return time.perf_counter() - start, len(flagged)
+
+
+def main(n):
+    messages = corpus(n)
+    print(f"{n} messages, {len(KEYWORDS)} keywords")
+    legacy, legacy_hits = timed(legacy_filter, messages)
+    print(f"  substring scan:  {legacy:8.2f} s  {legacy_hits} flagged")
+
+    engines = [("trie regex", False)] + ([("aho-corasick", True)] if matcher.ahocorasick else [])
+    for name, automaton in engines:
+        compiled = KeywordMatcher(KEYWORDS)
+        if not automaton:
+            compiled._automaton = None
+        elapsed, hits = timed(lambda ms: [msg for msg in ms if compiled.search(msg)], messages)
+        print(f"  {name + ':':16} {elapsed:8.2f} s  {hits} flagged  ({legacy / elapsed:.1f}x)")
+        elapsed, hits = timed(lambda ms: [h for msg in ms for h in compiled.find(msg)], messages)
+        print(f"  {name + ' spans:':16} {elapsed:8.2f} s  {hits} hits")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
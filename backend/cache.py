@@ -0,0 +1,189 @@
+# cache.py
+import json
+import sqlite3
+import threading
+import time
+from typing import NamedTuple
+
+
+class PageCache:
+    # Persistent per-URL validators (ETag, Last-Modified, content hash) for the discovery
+    # crawler, plus the page links it followed so an unchanged page can still be expanded.
+    def __init__(self, path):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            "url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, digest TEXT, fetched_at REAL, links TEXT)"
+        )
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(pages)")}
+        if "links" not in columns:
+            self._db.execute("ALTER TABLE pages ADD COLUMN links TEXT")
+        self._db.commit()
+
+    def get(self, url):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT etag, last_modified, digest, links FROM pages WHERE url = ?", (url,)
+            ).fetchone()
+        if not row:
+            return None
+        links = json.loads(row[3]) if row[3] is not None else None
+        return {"etag": row[0], "last_modified": row[1], "digest": row[2], "links": links}
+
+    def put(self, url, etag, last_modified, digest, links=None):
+        # links is None when the page was not followed, so its outgoing links are unknown
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO pages (url, etag, last_modified, digest, fetched_at, links) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (url, etag, last_modified, digest, time.time(), None if links is None else json.dumps(links)),
+            )
+            self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class DomainYield:
+    # Historical Telegram-link yield per domain, used to prioritise the crawl frontier
+    def __init__(self, path):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS domain_yield ("
+            "domain TEXT PRIMARY KEY, pages INTEGER NOT NULL, links INTEGER NOT NULL)"
+        )
+        self._db.commit()
+        self._stats = {
+            domain: [pages, links]
+            for domain, pages, links in self._db.execute("SELECT domain, pages, links FROM domain_yield")
+        }
+
+    def score(self, domain):
+        # Smoothed links-per-page; unseen domains start at 0.5
+        pages, links = self._stats.get(domain, (0, 0))
+        return (links + 1) / (pages + 2)
+
+    def record(self, domain, links):
+        with self._lock:
+            stats = self._stats.setdefault(domain, [0, 0])
+            stats[0] += 1
+            stats[1] += links
+            self._db.execute(
+                "INSERT OR REPLACE INTO domain_yield (domain, pages, links) VALUES (?, ?, ?)",
+                (domain, stats[0], stats[1]),
+            )
+            self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class SearchCache:
+    # Memoised search results keyed by (query, max_results), with a TTL and LRU eviction
+    def __init__(self, path, ttl=6 * 3600, max_entries=1000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS searches ("
+            "query TEXT NOT NULL, max_results INTEGER NOT NULL, urls TEXT NOT NULL, "
+            "fetched_at REAL NOT NULL, used_at REAL NOT NULL, PRIMARY KEY (query, max_results))"
+        )
+        self._db.commit()
+
+    def get(self, query, max_results):
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT urls, fetched_at FROM searches WHERE query = ? AND max_results = ?",
+                (query, max_results),
+            ).fetchone()
+            if not row or now - row[1] > self.ttl:
+                return None
+            self._db.execute(
+                "UPDATE searches SET used_at = ? WHERE query = ? AND max_results = ?",
+                (now, query, max_results),
+            )
+            self._db.commit()
+        return json.loads(row[0])
+
+    def put(self, query, max_results, urls):
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO searches (query, max_results, urls, fetched_at, used_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (query, max_results, json.dumps(urls), now, now),
+            )
+            self._db.execute(
+                "DELETE FROM searches WHERE rowid IN ("
+                "SELECT rowid FROM searches ORDER BY used_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class CachedPeer(NamedTuple):
+    id: int
+    access_hash: int
+    peer_type: str  # "channel", "chat" or "user"
+    title: str
+    joined: bool
+
+
+class EntityCache:
+    # Canonical invite link -> resolved Telegram peer, so re-scans skip joining and get_entity
+    def __init__(self, path):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entities ("
+            "link TEXT PRIMARY KEY, peer_id INTEGER NOT NULL, access_hash INTEGER, "
+            "peer_type TEXT NOT NULL, title TEXT, joined INTEGER NOT NULL, resolved_at REAL NOT NULL)"
+        )
+        self._db.commit()
+
+    def get(self, link):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT peer_id, access_hash, peer_type, title, joined FROM entities WHERE link = ?", (link,)
+            ).fetchone()
+        return CachedPeer(row[0], row[1], row[2], row[3], bool(row[4])) if row else None
+
+    def items(self, prefix=""):
+        # (link, CachedPeer) for every cached link starting with prefix, prefix stripped
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT link, peer_id, access_hash, peer_type, title, joined FROM entities "
+                "WHERE link LIKE ? || '%'", (prefix,)
+            ).fetchall()
+        return [(row[0][len(prefix):], CachedPeer(row[1], row[2], row[3], row[4], bool(row[5]))) for row in rows]
+
+    def put(self, link, peer):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO entities "
+                "(link, peer_id, access_hash, peer_type, title, joined, resolved_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (link, peer.id, peer.access_hash, peer.peer_type, peer.title, int(peer.joined), time.time()),
+            )
+            self._db.commit()
+        return peer
+
+    def invalidate(self, link):
+        with self._lock:
+            self._db.execute("DELETE FROM entities WHERE link = ?", (link,))
+            self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,39 @@
+# capacity.py
+import math
+from typing import NamedTuple
+
+
+class JoinedGroup(NamedTuple):
+    key: str  # canonical link key, as used by the entity cache
+    peer: object  # CachedPeer
+    flag_rate: float  # flagged messages per message seen
+    stale_hours: float  # hours since the group was last scanned (or joined)
+    messages_per_hour: float
+
+
+def group_value(group, flag_weight=100.0, activity_weight=1.0, stale_weight=1 / 24):
+    # Higher is worth keeping: groups that get flagged dominate, busy groups beat quiet
+    # ones, and every day without a scan costs a point
+    return (
+        flag_weight * group.flag_rate
+        + activity_weight * math.log1p(group.messages_per_hour)
+        - stale_weight * group.stale_hours
+    )
+
+
+class Capacity:
+    # Keeps an account's joined channel count below Telegram's limit, leaving headroom
+    # for the joins about to happen
+    def __init__(self, limit=500, headroom=20):
+        self.limit = limit
+        self.headroom = headroom
+
+    def excess(self, joined, incoming=0):
+        # How many channels to leave before joining `incoming` more
+        return max(0, joined + incoming - (self.limit - self.headroom))
+
+    def evictions(self, groups, count):
+        # The `count` least valuable groups, least valuable first
+        if count <= 0:
+            return []
+        return sorted(groups, key=group_value)[:count]
@@ -0,0 +1,75 @@
+# clients.py
+import bisect
+import hashlib
+import os
+
+
+def ring_hash(value):
+    return int.from_bytes(hashlib.md5(value.encode("utf-8")).digest()[:8], "big")
+
+
+class Account:
+    # One Telegram session with its own flood pacing (flood limits are per account)
+    def __init__(self, name, client, flood):
+        self.name = name
+        self.client = client
+        self.flood = flood
+
+    def cache_key(self, key):
+        # Access hashes are per account, so cached peers are too
+        return f"{self.name}|{key}"
+
+
+class ClientPool:
+    # Assigns groups to accounts by consistent hashing, so a group stays with the
+    # account that already joined it and adding an account only moves ~1/n of them.
+    def __init__(self, accounts, replicas=64):
+        self.replicas = replicas
+        self._build(accounts)
+
+    def _build(self, accounts):
+        self.accounts = list(accounts)
+        self._ring = sorted(
+            (ring_hash(f"{account.name}#{i}"), account)
+            for account in self.accounts for i in range(self.replicas)
+        )
+        self._points = [point for point, _ in self._ring]
+
+    def __iter__(self):
+        return iter(self.accounts)
+
+    def candidates(self, key):
+        # Accounts in ring order starting at the key's owner
+        start = bisect.bisect(self._points, ring_hash(key))
+        seen = []
+        for i in range(len(self._ring)):
+            account = self._ring[(start + i) % len(self._ring)][1]
+            if account not in seen:
+                seen.append(account)
+                if len(seen) == len(self.accounts):
+                    break
+        return seen
+
+    def owner(self, key):
+        return self.candidates(key)[0]
+
+    def pick(self, key, ready):
+        # The key's owner, or the next account in ring order for which ready(account)
+        # holds (e.g. not in a flood wait); falls back to the owner
+        candidates = self.candidates(key)
+        return next((a for a in candidates if ready(a)), candidates[0])
+
+    async def start(self, phone=None):
+        # The first account may log in interactively; others need an existing session file
+        for i, account in enumerate(self.accounts):
+            if os.path.exists(f"{account.name}.session"):
+                await account.client.start()
+            elif i == 0:
+                await account.client.start(phone=phone)
+            else:
+                print(f"No session file for {account.name}, skipping")
+        self._build(a for a in self.accounts if a.client.is_connected())
+
+    async def disconnect(self):
+        for account in self.accounts:
+            await account.client.disconnect()
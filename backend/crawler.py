@@ -0,0 +1,178 @@
+# crawler.py
+import asyncio
+import hashlib
+import time
+from urllib.parse import urlsplit
+
+import httpx
+
+from ratelimit import TokenBucket
+
+USER_AGENT = "Mozilla/5.0"
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class Host:
+    # Politeness state for one host: concurrency slot, request rate and backoff
+    def __init__(self, per_host, rate):
+        self.slots = asyncio.Semaphore(per_host)
+        self.bucket = TokenBucket(rate, capacity=max(1, per_host))
+        self.backoff_until = 0.0
+        self.failures = 0
+
+    def ready_in(self):
+        return max(self.backoff_until - time.monotonic(), self.bucket.delay())
+
+    def back_off(self, retry_after=None, max_backoff=300):
+        self.failures += 1
+        delay = min(max_backoff, retry_after if retry_after is not None else 2 ** self.failures)
+        self.backoff_until = time.monotonic() + delay
+        return delay
+
+
+class Crawler:
+    # Pooled keep-alive HTTP client with a global concurrency cap and, per host, a
+    # concurrency limit, a token-bucket request rate and backoff on 429/5xx.
+    # With a PageCache attached, unchanged pages are revalidated with conditional
+    # GETs and fetch() returns None for them, so callers skip parsing entirely; the
+    # links such a page led to last time are available from unchanged_links().
+    # Backoff is capped at max_backoff; urls on a host backing off for longer than
+    # max_retry_wait are not retried (or popped) in this crawl.
+    def __init__(self, max_connections=20, per_host=2, host_rate=1.0, max_retries=2, timeout=10, cache=None,
+                 max_backoff=300, max_retry_wait=30):
+        self.max_connections = max_connections
+        self.max_backoff = max_backoff
+        self.max_retry_wait = max_retry_wait
+        self.per_host = per_host
+        self.host_rate = host_rate
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.cache = cache
+        self._pending = {}
+        self._unchanged = {}
+        self._attempts = {}
+        self._client = None
+        self._slots = asyncio.Semaphore(max_connections)
+        self._hosts = {}
+
+    async def start(self):
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                follow_redirects=True,
+                headers={"User-Agent": USER_AGENT},
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+            )
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    def _host(self, url):
+        name = urlsplit(url).netloc.lower()
+        host = self._hosts.get(name)
+        if host is None:
+            host = self._hosts[name] = Host(self.per_host, self.host_rate)
+        return host
+
+    def ready_in(self, url):
+        # Seconds until a request to url's host is allowed; schedulers use this to run other hosts first
+        try:
+            return self._host(url).ready_in()
+        except ValueError:
+            return 0  # fetch() drops malformed urls right away
+
+    def retryable(self, url):
+        # True if the last fetch of url was throttled or hit a server error and may be
+        # retried soon enough to be worth keeping in this crawl
+        return 0 < self._attempts.get(url, 0) <= self.max_retries and self.ready_in(url) <= self.max_retry_wait
+
+    async def fetch(self, url, follow=False):
+        # Returns the raw page bytes, or None on network errors, non-200 responses and unchanged pages.
+        # With follow set, a page whose outgoing links were never stored is fetched in full.
+        await self.start()
+        try:
+            parts = urlsplit(url)
+            if parts.scheme not in ("http", "https") or not parts.hostname:
+                raise ValueError("not an absolute http(s) url")
+            parts.port  # raises ValueError for ports outside 0-65535
+            host = self._host(url)
+        except ValueError as e:
+            print(f"Skipping malformed url {url}: {e}")
+            return None
+        cached = self.cache.get(url) if self.cache else None
+        if cached and follow and cached["links"] is None:
+            cached = None
+        headers = {}
+        if cached:
+            if cached["etag"]:
+                headers["If-None-Match"] = cached["etag"]
+            if cached["last_modified"]:
+                headers["If-Modified-Since"] = cached["last_modified"]
+
+        async with self._slots, host.slots:
+            wait = host.backoff_until - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            await host.bucket.acquire()
+            try:
+                resp = await self._client.get(url, headers=headers)
+            except (httpx.HTTPError, httpx.InvalidURL, ValueError) as e:
+                # InvalidURL (e.g. a followed href like http://localhost:PORT/) is not an HTTPError
+                print(f"Error scraping {url}: {e}")
+                return None
+
+        if resp.status_code in RETRY_STATUSES:
+            retry_after = resp.headers.get("Retry-After", "")
+            delay = host.back_off(int(retry_after) if retry_after.isdigit() else None, self.max_backoff)
+            self._attempts[url] = self._attempts.get(url, 0) + 1
+            print(f"{resp.status_code} from {url}, backing off host for {delay}s")
+            return None
+        host.failures = 0
+        self._attempts.pop(url, None)
+
+        if resp.status_code == 304:
+            print(f"Unchanged {url}")
+            self._unchanged[url] = cached["links"] if cached else None
+            return None
+        if resp.status_code != 200:
+            return None
+
+        if self.cache:
+            digest = hashlib.sha256(resp.content).hexdigest()
+            etag = resp.headers.get("ETag")
+            last_modified = resp.headers.get("Last-Modified")
+            if cached and cached["digest"] == digest:
+                self.cache.put(url, etag, last_modified, digest, cached["links"])
+                print(f"Unchanged {url}")
+                self._unchanged[url] = cached["links"]
+                return None
+            self._pending[url] = (etag, last_modified, digest, None)
+        return resp.content
+
+    def unchanged_links(self, url):
+        # Page links stored for url if its last fetch found it unchanged, else None
+        return self._unchanged.pop(url, None)
+
+    def followed(self, url, links):
+        # Remember the page links parsed from a fetched page, saved by commit()
+        entry = self._pending.get(url)
+        if entry:
+            self._pending[url] = entry[:3] + (links,)
+
+    def commit(self, url):
+        # Record a fetched page as processed; until then a failed run will refetch it
+        entry = self._pending.pop(url, None)
+        if entry and self.cache:
+            self.cache.put(url, *entry)
@@ -0,0 +1,144 @@
+# frontier.py
+import asyncio
+import heapq
+import itertools
+from urllib.parse import urlsplit
+
+from links import parse_page
+
+
+def domain_of(url):
+    host = urlsplit(url).netloc.lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+class Frontier:
+    # Priority queue of URLs to visit. Priority is the domain's historical yield;
+    # a domain is dropped for the rest of the crawl after `patience` pages in a row
+    # that produced no new Telegram links.
+    def __init__(self, stats, max_depth=1, max_pages=200, patience=2):
+        self.stats = stats
+        self.max_depth = max_depth
+        self.max_pages = max_pages
+        self.patience = patience
+        self.popped = 0
+        self._heap = []
+        self._seen = set()
+        self._order = itertools.count()
+        self._dry_streak = {}
+
+    def exhausted(self, domain):
+        return self._dry_streak.get(domain, 0) >= self.patience
+
+    def push(self, url, depth=0):
+        domain = domain_of(url)
+        if url in self._seen or depth > self.max_depth or self.exhausted(domain):
+            return
+        self._seen.add(url)
+        heapq.heappush(self._heap, (-self.stats.score(domain), depth, next(self._order), url))
+
+    def pending(self):
+        return bool(self._heap) and self.popped < self.max_pages
+
+    def pop(self, ready_in=None, max_wait=None):
+        # Highest-priority url whose host is ready now; entries for hosts that are
+        # rate limited or backing off stay queued for a later pop, unless the host is
+        # backing off for longer than max_wait, in which case they are dropped this run.
+        deferred = []
+        try:
+            while self._heap and self.popped < self.max_pages:
+                entry = heapq.heappop(self._heap)
+                url = entry[3]
+                if self.exhausted(domain_of(url)):
+                    continue
+                wait = ready_in(url) if ready_in else 0
+                if max_wait is not None and wait > max_wait:
+                    continue
+                if wait > 0:
+                    deferred.append(entry)
+                    continue
+                self.popped += 1
+                return url, entry[1]
+            return None
+        finally:
+            for entry in deferred:
+                heapq.heappush(self._heap, entry)
+
+    def retry(self, url, depth):
+        self.popped -= 1
+        heapq.heappush(self._heap, (-self.stats.score(domain_of(url)), depth, next(self._order), url))
+
+    def record(self, url, new_links):
+        domain = domain_of(url)
+        self.stats.record(domain, new_links)
+        self._dry_streak[domain] = 0 if new_links else self._dry_streak.get(domain, 0) + 1
+
+
+async def crawl_frontier(crawler, frontier, handle, workers=8, pool=None, parse_workers=4, queue_size=32):
+    # Visit the frontier until it is empty or out of budget. Fetchers feed a bounded
+    # queue; parsers run parse_page in `pool` (a process pool, or the default thread
+    # pool when None) so parsing never blocks the event loop. handle(url, links) gets
+    # the page's canonical links and must return how many were new. Returns the visited urls.
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue(maxsize=queue_size)
+    visited = []
+    active = 0  # urls popped and not yet fully processed: fetching, queued or parsing
+
+    async def fetcher():
+        nonlocal active
+        while True:
+            item = frontier.pop(crawler.ready_in, crawler.max_retry_wait)
+            if item is None:
+                if not active and not frontier.pending():
+                    return
+                await asyncio.sleep(0.05)
+                continue
+            url, depth = item
+            active += 1
+            page = None
+            follow = depth < frontier.max_depth
+            try:
+                page = await crawler.fetch(url, follow)
+            finally:
+                if not page:
+                    if crawler.retryable(url):
+                        frontier.retry(url, depth)
+                    # An unchanged page is not parsed again, but its links still lead on
+                    children = crawler.unchanged_links(url)
+                    if children and follow:
+                        for child in children:
+                            frontier.push(child, depth + 1)
+                    active -= 1
+            if page:
+                await queue.put((url, depth, page))
+
+    async def parser():
+        nonlocal active
+        while True:
+            url, depth, page = await queue.get()
+            try:
+                links, children = await loop.run_in_executor(
+                    pool, parse_page, url, page, depth < frontier.max_depth
+                )
+                visited.append(url)
+                if depth < frontier.max_depth:
+                    crawler.followed(url, children)
+                frontier.record(url, handle(url, links))
+                for child in children:
+                    frontier.push(child, depth + 1)
+            except Exception as e:
+                print(f"Error scraping {url}: {e}")
+            finally:
+                active -= 1
+                queue.task_done()
+
+    parsers = [asyncio.create_task(parser()) for _ in range(parse_workers)]
+    fetchers = [asyncio.create_task(fetcher()) for _ in range(workers)]
+    try:
+        await asyncio.gather(*fetchers)
+        await queue.join()
+    finally:
+        # If one fetcher fails, don't leave its siblings running unawaited
+        for task in fetchers + parsers:
+            task.cancel()
+    return visited
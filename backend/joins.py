@@ -0,0 +1,129 @@
+# joins.py
+import sqlite3
+import threading
+import time
+
+
+class JoinQueue:
+    # Persistent queue of links waiting to be joined, per account, with a log of every
+    # join attempt so hourly and daily join budgets survive restarts.
+    def __init__(self, path, per_hour=10, per_day=50, request_retry=86400):
+        self.per_hour = per_hour
+        self.per_day = per_day
+        self.request_retry = request_retry
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS join_queue ("
+            "account TEXT NOT NULL, link TEXT NOT NULL, invite_link TEXT NOT NULL, "
+            "status TEXT NOT NULL DEFAULT 'pending', attempts INTEGER NOT NULL DEFAULT 0, "
+            "last_error TEXT, enqueued_at REAL NOT NULL, updated_at REAL NOT NULL, "
+            "PRIMARY KEY (account, link))"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS join_log ("
+            "account TEXT NOT NULL, link TEXT NOT NULL, outcome TEXT NOT NULL, at REAL NOT NULL)"
+        )
+        self._db.commit()
+
+    def enqueue(self, account, link, invite_link):
+        # New links are queued; a link that was joined before goes back to pending (the
+        # peer was left or lost), as does a join request nobody answered within
+        # request_retry seconds. Failed (dead) and evicted links stay as they are.
+        now = time.time()
+        with self._lock:
+            cursor = self._db.execute(
+                "INSERT INTO join_queue (account, link, invite_link, enqueued_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (account, link) DO UPDATE SET status = 'pending', "
+                "invite_link = excluded.invite_link, last_error = NULL, updated_at = excluded.updated_at "
+                "WHERE status = 'joined' OR (status = 'requested' AND updated_at < ?)",
+                (account, link, invite_link, now, now, now - self.request_retry),
+            )
+            self._db.commit()
+        return cursor.rowcount > 0
+
+    def pending(self, account, limit):
+        with self._lock:
+            return self._db.execute(
+                "SELECT link, invite_link FROM join_queue WHERE account = ? AND status = 'pending' "
+                "ORDER BY attempts, enqueued_at LIMIT ?",
+                (account, limit),
+            ).fetchall()
+
+    def waiting(self):
+        # Links not joined on any account: queued joins, unanswered join requests that
+        # are not yet due for a retry, and groups left to make room for better ones
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT DISTINCT link FROM join_queue WHERE status IN ('pending', 'evicted') "
+                "OR (status = 'requested' AND updated_at >= ?)",
+                (time.time() - self.request_retry,),
+            ).fetchall()
+        return {link for link, in rows}
+
+    def budget(self, account):
+        # Joins this account may still attempt right now
+        now = time.time()
+        with self._lock:
+            last_hour, last_day = self._db.execute(
+                "SELECT SUM(at >= ?), COUNT(*) FROM join_log WHERE account = ? AND at >= ?",
+                (now - 3600, account, now - 86400),
+            ).fetchone()
+        return max(0, min(self.per_hour - (last_hour or 0), self.per_day - (last_day or 0)))
+
+    def record(self, account, link, outcome, status, error=None):
+        # outcome is logged; status is the queue state afterwards ("pending" to retry later)
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO join_log (account, link, outcome, at) VALUES (?, ?, ?, ?)",
+                (account, link, outcome, now),
+            )
+            self._db.execute(
+                "UPDATE join_queue SET status = ?, attempts = attempts + 1, last_error = ?, updated_at = ? "
+                "WHERE account = ? AND link = ?",
+                (status, error, now, account, link),
+            )
+            self._db.commit()
+
+    def evict(self, account, link):
+        # The chat was left to free a channel slot; scans must not queue it again
+        with self._lock:
+            self._db.execute(
+                "UPDATE join_queue SET status = 'evicted', updated_at = ? WHERE account = ? AND link = ?",
+                (time.time(), account, link),
+            )
+            self._db.commit()
+
+    def forget(self, account, link):
+        # Drop a link's queue row once its chat has been left; the join log (and with
+        # it the join budget) is kept. A later scan queues the link afresh.
+        with self._lock:
+            self._db.execute("DELETE FROM join_queue WHERE account = ? AND link = ?", (account, link))
+            self._db.commit()
+
+    def joined_at(self, account):
+        # {link: time it was joined} for links this account has joined
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT link, updated_at FROM join_queue WHERE account = ? AND status = 'joined'",
+                (account,),
+            ).fetchall()
+        return dict(rows)
+
+    def stats(self):
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT account, status, COUNT(*) FROM join_queue GROUP BY account, status"
+            ).fetchall()
+        stats = {}
+        for account, status, count in rows:
+            stats.setdefault(account, {})[status] = count
+        for account in stats:
+            stats[account]["budget"] = self.budget(account)
+        return stats
+
+    def close(self):
+        with self._lock:
+            self._db.close()
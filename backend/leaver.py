@@ -0,0 +1,85 @@
+# leaver.py
+import asyncio
+import time
+
+from telethon.errors import FloodWaitError
+
+
+class BulkLeave:
+    # Background job that leaves a list of chats per account with bounded concurrency.
+    # leave(account, entity) is awaited per chat (under the account's flood scheduler)
+    # and on_left(account, entity) is called for every chat actually left; a flood wait
+    # parks the job until it expires, then it resumes with the chats not yet left.
+    # progress() can be polled while it runs.
+    def __init__(self, leave, concurrency=4):
+        self.leave = leave
+        self.concurrency = concurrency
+        self._progress = {}
+        self._tasks = {}
+
+    def running(self):
+        return any(not task.done() for task in self._tasks.values())
+
+    def start(self, account, entities, skipped=(), on_left=None):
+        if account.name in self._tasks and not self._tasks[account.name].done():
+            return False
+        self._progress[account.name] = {
+            "status": "running", "total": len(entities), "left": [], "skipped": list(skipped),
+            "errors": [], "resume_at": None, "started_at": time.time(), "finished_at": None
+        }
+        self._tasks[account.name] = asyncio.create_task(self._run(account, list(entities), on_left))
+        return True
+
+    async def _run(self, account, pending, on_left):
+        progress = self._progress[account.name]
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def leave_one(entity):
+            async with semaphore:
+                try:
+                    await self.leave(account, entity)
+                except FloodWaitError as e:
+                    return e.seconds
+                except Exception as e:
+                    progress["errors"].append(describe(entity, str(e)))
+                    return None
+                progress["left"].append(describe(entity))
+                if on_left:
+                    on_left(account, entity)
+                return None
+
+        try:
+            while pending:
+                waits = await asyncio.gather(*(leave_one(entity) for entity in pending))
+                pending = [entity for entity, wait in zip(pending, waits) if wait is not None]
+                if pending:
+                    wait = max(w for w in waits if w is not None)
+                    progress["status"] = "flood_wait"
+                    progress["resume_at"] = time.time() + wait
+                    print(f"Bulk leave on {account.name} hit a {wait}s flood wait, {len(pending)} chats left to go")
+                    await asyncio.sleep(wait)
+                    progress["status"], progress["resume_at"] = "running", None
+            progress["status"] = "done"
+        except asyncio.CancelledError:
+            progress["status"] = "cancelled"
+            raise
+        finally:
+            progress["finished_at"] = time.time()
+
+    def progress(self):
+        return {
+            name: {**p, "left_count": len(p["left"]), "remaining": p["total"] - len(p["left"]) - len(p["errors"])}
+            for name, p in self._progress.items()
+        }
+
+    async def stop(self):
+        for task in self._tasks.values():
+            task.cancel()
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+
+
+def describe(entity, error=None):
+    item = {"id": entity.id, "title": getattr(entity, "title", "Unknown")}
+    if error:
+        item["error"] = error
+    return item
@@ -0,0 +1,146 @@
+# links.py
+import html
+import os
+import re
+import threading
+from typing import NamedTuple
+from urllib.parse import urldefrag, urljoin, urlsplit
+
+# One pass over the raw page bytes: matches t.me / telegram.me references wherever
+# they appear (visible text, href/src attributes, inline scripts) without building a DOM.
+# The lookbehind rejects look-alike hosts such as "//tttttt.me".
+tme_bytes_regex = re.compile(
+    rb"(?<![\w.-])(?:https?:)?(?://)?(?:www\.)?(?:t|telegram)\.me/[^\s\"'<>()\[\]{}\\|^`]+",
+    re.IGNORECASE,
+)
+
+TRAILING_PUNCTUATION = ".,;:!?*"
+
+href_bytes_regex = re.compile(rb"""href\s*=\s*["']?([^"'\s>#]+)""", re.IGNORECASE)
+
+TELEGRAM_HOSTS = {"t.me", "www.t.me", "telegram.me", "www.telegram.me"}
+SKIP_EXTENSIONS = (
+    ".css", ".js", ".json", ".xml", ".png", ".jpg", ".jpeg", ".gif", ".svg", ".webp",
+    ".ico", ".pdf", ".zip", ".mp3", ".mp4", ".woff", ".woff2",
+)
+
+
+def extract_telegram_links(page):
+    if isinstance(page, str):
+        page = page.encode("utf-8", "ignore")
+    links = set()
+    for match in tme_bytes_regex.finditer(page):
+        link = html.unescape(match.group().decode("utf-8", "ignore")).rstrip(TRAILING_PUNCTUATION)
+        if not link.lower().endswith((".me", ".me/")):
+            links.add(link)
+    return list(links)
+
+
+def extract_page_links(page, base_url):
+    # Absolute http(s) links to other pages, for following from the crawl frontier
+    urls = set()
+    for match in href_bytes_regex.finditer(page):
+        href = html.unescape(match.group(1).decode("utf-8", "ignore"))
+        if href.startswith(("mailto:", "javascript:", "tel:", "data:")):
+            continue
+        try:
+            url = urldefrag(urljoin(base_url, href)).url
+            parts = urlsplit(url)
+            parts.port  # raises ValueError for ports outside 0-65535
+        except ValueError:
+            continue
+        if parts.scheme not in ("http", "https") or not parts.hostname or parts.netloc.lower() in TELEGRAM_HOSTS:
+            continue
+        if parts.path.lower().endswith(SKIP_EXTENSIONS):
+            continue
+        urls.add(url)
+    return list(urls)
+
+
+# ------------------ Canonical invite links ------------------
+class InviteLink(NamedTuple):
+    kind: str  # "username", "invite" (joinchat/+ hash) or "channel" (t.me/c/<id>)
+    value: str
+
+    @property
+    def key(self):
+        return f"{self.kind}:{self.value}"
+
+    @property
+    def url(self):
+        if self.kind == "invite":
+            return f"https://t.me/+{self.value}"
+        if self.kind == "channel":
+            return f"https://t.me/c/{self.value}"
+        return f"https://t.me/{self.value}"
+
+
+# Paths on t.me that are not groups or channels
+RESERVED_PATHS = {
+    "addemoji", "addlist", "addstickers", "addtheme", "bg", "boost", "confirmphone",
+    "contact", "invoice", "iv", "login", "proxy", "setlanguage", "share", "socks",
+}
+
+tme_link_regex = re.compile(
+    r"^(?:https?:)?(?://)?(?:www\.)?(?:t|telegram)\.me/(?P<path>[^?#]*)", re.IGNORECASE
+)
+username_regex = re.compile(r"^[A-Za-z][A-Za-z0-9_]{3,31}$")
+invite_hash_regex = re.compile(r"^[A-Za-z0-9_-]{10,}$")
+
+
+def canonicalize(link):
+    # Map any t.me variant to an InviteLink, or None for junk and non-group links
+    match = tme_link_regex.match(link.strip())
+    if not match:
+        return None
+    parts = [p for p in match.group("path").split("/") if p]
+    if not parts:
+        return None
+
+    head = parts[0]
+    if head.startswith("+") or head.lower() == "joinchat":
+        invite_hash = head[1:] if head.startswith("+") else (parts[1] if len(parts) > 1 else "")
+        # t.me/+<digits> is a phone-number link to a user, not an invite hash
+        if invite_hash.isdigit() or not invite_hash_regex.match(invite_hash):
+            return None
+        return InviteLink("invite", invite_hash)
+    if head.lower() == "c":
+        return InviteLink("channel", parts[1]) if len(parts) > 1 and parts[1].isdigit() else None
+    if head.lower() == "s" and len(parts) > 1:
+        head = parts[1]
+    if head.lower() in RESERVED_PATHS or not username_regex.match(head):
+        return None
+    return InviteLink("username", head.lower())
+
+
+class LinkIndex:
+    # Process-wide set of canonical link keys already stored, persisted as one key per line
+    def __init__(self, path):
+        self.path = path
+        self._keys = set()
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self._keys.update(line.strip() for line in f if line.strip())
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, key):
+        return key in self._keys
+
+    def add(self, *keys):
+        with self._lock:
+            new = [k for k in dict.fromkeys(keys) if k not in self._keys]
+            if new:
+                self._keys.update(new)
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.writelines(k + "\n" for k in new)
+        return new
+
+
+def parse_page(url, page, follow=True):
+    # CPU-bound half of the crawl, run in the parse pool: canonical Telegram links
+    # on the page, plus the page links to follow when `follow` is set
+    links = {link for link in map(canonicalize, extract_telegram_links(page)) if link}
+    return list(links), (extract_page_links(page, url) if follow else [])
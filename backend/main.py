@@ -2,24 +2,45 @@
 from telethon import TelegramClient
 from telethon.tl.functions.messages import ImportChatInviteRequest
 from telethon.tl.functions.channels import JoinChannelRequest, LeaveChannelRequest
-from telethon.errors import UserAlreadyParticipantError, FloodWaitError
+from telethon import utils
+from telethon.tl.types import InputPeerChannel, InputPeerChat, InputPeerUser
+from telethon.errors import (
+    UserAlreadyParticipantError, FloodWaitError, ChannelPrivateError, ChannelInvalidError,
+    ChatForbiddenError, ChatIdInvalidError, PeerIdInvalidError, UserBannedInChannelError,
+    InviteHashExpiredError, InviteHashInvalidError, InviteRequestSentError,
+    UsernameNotOccupiedError, UsernameInvalidError
+)
 import asyncio
+import math
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from dotenv import load_dotenv
 import os
-import re
-import requests
-from bs4 import BeautifulSoup
-from ddgs import DDGS
+import time
 import uvicorn
 from fastapi import FastAPI, Query, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from datetime import datetime, timezone
+from typing import Optional
+from datetime import datetime, timedelta, timezone
 from contextlib import asynccontextmanager
 from supabase import create_client
 import pytz
 import spacy
 from textblob import TextBlob
+from crawler import Crawler
+from cache import PageCache, DomainYield, SearchCache, EntityCache, CachedPeer
+from frontier import Frontier, crawl_frontier
+from search import search_fan_out
+from scheduler import FloodScheduler
+from clients import Account, ClientPool
+from monitor import Monitor
+from joins import JoinQueue
+from backfill import BackfillCheckpoints, run_backfill
+from capacity import Capacity, JoinedGroup
+from leaver import BulkLeave, describe
+from rules import RulePacks
+from links import canonicalize, LinkIndex
 
 # ------------------ Load Env ------------------
 load_dotenv()
@@ -33,17 +54,65 @@ supabase = create_client(url, key)
 api_id = os.getenv("API_ID")
 api_hash = os.getenv("API_HASH")
 phone_number = os.getenv("PHONE_NUMBER")
-client = TelegramClient("session_name", api_id, api_hash)
+entity_cache = EntityCache(os.getenv("ENTITY_CACHE_PATH", "entity_cache.db"))
+capacity = Capacity(
+    limit=int(os.getenv("CHANNEL_LIMIT", 500)),
+    headroom=int(os.getenv("CHANNEL_HEADROOM", 20))
+)
+backfills = BackfillCheckpoints(os.getenv("BACKFILL_PATH", "backfill.db"))
+join_queue = JoinQueue(
+    os.getenv("JOIN_QUEUE_PATH", "join_queue.db"),
+    per_hour=int(os.getenv("JOINS_PER_HOUR", 10)),
+    per_day=int(os.getenv("JOINS_PER_DAY", 50)),
+    request_retry=int(os.getenv("JOIN_REQUEST_RETRY", 86400)),
+)
+
+# One account per session name; groups are sharded across them by consistent hashing
+session_names = [n.strip() for n in os.getenv("TELEGRAM_SESSIONS", "session_name").split(",") if n.strip()]
+# flood_sleep_threshold=0: Telethon raises every FloodWaitError instead of sleeping through
+# short ones itself, so the FloodScheduler sees (and paces around) all of them
+clients = ClientPool(
+    Account(name, TelegramClient(name, api_id, api_hash, flood_sleep_threshold=0), FloodScheduler(
+        concurrency=int(os.getenv("SCAN_CONCURRENCY", 4)),
+        max_wait=int(os.getenv("FLOOD_MAX_WAIT", 60)),
+    ))
+    for name in session_names
+)
+
+# ------------------ Crawler ------------------
+crawler = Crawler(
+    max_connections=int(os.getenv("CRAWL_CONCURRENCY", 20)),
+    per_host=int(os.getenv("CRAWL_PER_HOST", 2)),
+    host_rate=float(os.getenv("CRAWL_HOST_RPS", 1)),
+    max_retry_wait=float(os.getenv("CRAWL_MAX_RETRY_WAIT", 30)),
+    cache=PageCache(os.getenv("PAGE_CACHE_PATH", "page_cache.db")),
+)
+domain_yield = DomainYield(os.getenv("PAGE_CACHE_PATH", "page_cache.db"))
+CRAWL_DEPTH = int(os.getenv("CRAWL_DEPTH", 1))
+CRAWL_MAX_PAGES = int(os.getenv("CRAWL_MAX_PAGES", 200))
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", os.cpu_count() or 2))
+# Created in lifespan with spawned workers: forking this process would copy its
+# Telethon, sqlite and event-loop state (and spaCy) into every parser
+parse_pool = None
+link_index = LinkIndex(os.getenv("LINK_INDEX_PATH", "known_links.txt"))
+SEARCH_QPS = float(os.getenv("SEARCH_QPS", 1))
+SEARCH_CONCURRENCY = int(os.getenv("SEARCH_CONCURRENCY", 4))
+search_cache = SearchCache(
+    os.getenv("SEARCH_CACHE_PATH", "search_cache.db"),
+    ttl=int(os.getenv("SEARCH_CACHE_TTL", 6 * 3600)),
+    max_entries=int(os.getenv("SEARCH_CACHE_SIZE", 1000)),
+)
 
 # ------------------ NLP ------------------
 nlp = spacy.load("en_core_web_sm")  # Use small model, fast for Named Entities
 
 # ------------------ Keywords & Patterns ------------------
-telegram_keywords = [
-    "buy", "sell", "target", "stock", "intraday", "call", "tip", "signal", 
-    "profit", "loss", "broker", "registered", "SEBI", "investment", "trade", 
-    "alerts", "trading", "equity", "nifty", "sensex", "shares"
-]
+# Flagging keywords, patterns and scoring weights live in a versioned rule pack that is
+# reloaded when the file changes (see rules/default.json)
+rule_packs = RulePacks(
+    os.getenv("RULE_PACK_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "rules", "default.json")),
+    check_interval=int(os.getenv("RULE_PACK_CHECK_INTERVAL", 5))
+)
 
 internet_keywords = [
     "telegram stock tips group", "telegram sebi registered stock tips",
@@ -52,78 +121,100 @@ internet_keywords = [
     "telegram investment tips", "telegram day trading signals"
 ]
 
-# Improved regex for telegram invite links
-telegram_regex = re.compile(
-    r"(https?://t\.me/(joinchat/)?(\+?[a-zA-Z0-9_-]{5,})|https?://t\.me/c/\d+/[0-9]+)"
-)
-
-stock_tip_pattern = re.compile(r"(buy|sell)\s+[A-Za-z]+\s+at\s+\d+", re.IGNORECASE)
-
 # ------------------ SearchWeb Integration ------------------
-def fetch_search_results(query, max_results=10):
-    urls = []
-    with DDGS() as ddgs:
-        for r in ddgs.text(query, max_results=max_results):
-            urls.append(r["href"])
-    return urls
-
-def scrape_telegram_links(url):
-    links = []
-    try:
-        resp = requests.get(url, timeout=10, headers={"User-Agent": "Mozilla/5.0"})
-        if resp.status_code == 200:
-            soup = BeautifulSoup(resp.text, "html.parser")
-            text = soup.get_text(" ", strip=True)
-            links.extend(telegram_regex.findall(text))
-
-            for a in soup.find_all("a", href=True):
-                if "t.me" in a["href"]:
-                    links.append(a["href"])
-    except Exception as e:
-        print(f"Error scraping {url}: {e}")
-    return list(set(links))
-
-def save_to_db(invite_link, source_url):
-    source = supabase.table("external_sources").select("source_id").eq("url", source_url).execute()
-    if source.data:
-        source_id = source.data[0]["source_id"]
-    else:
-        inserted = supabase.table("external_sources").insert({
-            "url": source_url,
-            "domain": source_url.split("/")[2]
-        }).execute()
-        source_id = inserted.data[0]["source_id"]
-
-    existing = supabase.table("found_links").select("found_id") \
-        .eq("invite_link", invite_link).eq("source_id", source_id).execute()
-    if not existing.data:
-        supabase.table("found_links").insert({
-            "source_id": source_id,
-            "invite_link": invite_link,
-            "confidence_score": 0.8
-        }).execute()
-        print(f"Saved {invite_link} (source:{source_url})")
-    else:
-        print(f"Skipped duplicate {invite_link} from {source_url}")
-
-async def scan_new_groups():
-    for keyword in internet_keywords:
-        print(f"\nSearching: {keyword}")
-        urls = fetch_search_results(keyword, max_results=5)
-        for url in urls:
-            tg_links = scrape_telegram_links(url)
-            for link in tg_links:
-                save_to_db(link, url)
+def chunked(rows, size):
+    for i in range(0, len(rows), size):
+        yield rows[i:i + size]
+
+def save_to_db(pairs, batch_size=500):
+    # Bulk-ingest (invite_link, source_url) pairs: one upsert per batch of sources, one per batch of links.
+    # Relies on unique keys external_sources(url) and found_links(invite_link, source_id).
+    if not pairs:
+        return
+    source_ids = {}
+    sources = [{"url": u, "domain": u.split("/")[2]} for u in dict.fromkeys(u for _, u in pairs)]
+    for batch in chunked(sources, batch_size):
+        upserted = supabase.table("external_sources").upsert(batch, on_conflict="url").execute()
+        source_ids.update((row["url"], row["source_id"]) for row in upserted.data)
+
+    rows = [{
+        "source_id": source_ids[source_url],
+        "invite_link": invite_link,
+        "confidence_score": rule_packs.current().scorer.prior
+    } for invite_link, source_url in dict.fromkeys(pairs)]
+    for batch in chunked(rows, batch_size):
+        supabase.table("found_links") \
+            .upsert(batch, on_conflict="invite_link,source_id", ignore_duplicates=True).execute()
+    print(f"Saved {len(rows)} links from {len(sources)} sources")
+
+def seed_link_index(page_size=1000):
+    # Load every stored invite link into the dedupe index (first run / lost index file).
+    # Keyset pagination on found_id: unordered .range() pages can skip or repeat rows.
+    last_id = 0
+    while True:
+        rows = supabase.table("found_links").select("found_id, invite_link") \
+            .gt("found_id", last_id).order("found_id").limit(page_size).execute().data or []
+        keys = [link.key for link in (canonicalize(r["invite_link"]) for r in rows) if link]
+        link_index.add(*keys)
+        if len(rows) < page_size:
+            break
+        last_id = rows[-1]["found_id"]
+    print(f"Link index seeded with {len(link_index)} known links")
+
+async def scan_new_groups(refresh=()):
+    if not len(link_index):
+        await asyncio.to_thread(seed_link_index)
+    found = await search_fan_out(
+        internet_keywords, max_results=5, qps=SEARCH_QPS, concurrency=SEARCH_CONCURRENCY,
+        cache=search_cache, refresh=refresh
+    )
+    print(f"\n{len(found)} unique result urls across {len(internet_keywords)} keywords")
+
+    frontier = Frontier(domain_yield, max_depth=CRAWL_DEPTH, max_pages=CRAWL_MAX_PAGES)
+    for url in found:
+        frontier.push(url)
+
+    pairs, keys = [], set()
+
+    def collect_links(url, links):
+        new_links = 0
+        for link in links:
+            if link.key in link_index or link.key in keys:
+                continue
+            keys.add(link.key)
+            pairs.append((link.url, url))
+            new_links += 1
+        return new_links
+
+    visited = await crawl_frontier(
+        crawler, frontier, collect_links,
+        workers=crawler.max_connections, pool=parse_pool, parse_workers=PARSE_WORKERS
+    )
+    print(f"Crawled {len(visited)} pages, {len(pairs)} new links")
+
+    await asyncio.to_thread(save_to_db, pairs)
+    link_index.add(*keys)
+    for url in visited:
+        crawler.commit(url)
 
 # ------------------ FastAPI ------------------
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    if os.path.exists("session_name.session"):
-        await client.start()
-    else:
-        await client.start(phone=phone_number)
+    global parse_pool
+    parse_pool = ProcessPoolExecutor(max_workers=PARSE_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    await clients.start(phone=phone_number)
+    await crawler.start()
+    if os.getenv("MONITOR_ON_STARTUP") == "1":
+        await monitor.start(await asyncio.to_thread(monitored_chats))
+    joiner = asyncio.create_task(join_loop())
     yield
-    await client.disconnect()
+    joiner.cancel()
+    await bulk_leave.stop()
+    await monitor.stop()
+    parse_pool.shutdown(wait=False, cancel_futures=True)
+    parse_pool = None
+    await crawler.close()
+    await clients.disconnect()
 
 app = FastAPI(lifespan=lifespan)
 app.add_middleware(
@@ -136,161 +227,672 @@ app.add_middleware(
 
 class SingleLink(BaseModel):
     invite_link: str
+    since: Optional[datetime] = None
+    until: Optional[datetime] = None
+
+# ------------------ Message Analysis ------------------
+def analyze_messages(messages):
+    # One rule-engine pass per message and a batch prescore; NLP runs only on messages
+    # that clear the NLP gate, and only those scoring above the flag threshold are kept.
+    # Returns (flagged_messages, nlp_results, risk score of the batch).
+    pack = rule_packs.current()
+    rule_engine, risk_scorer = pack.engine, pack.scorer
+    verdicts = [rule_engine.evaluate(msg) for msg in messages]
+    prescores = risk_scorer.prescore(verdicts)
+    candidates = [i for i, p in enumerate(prescores) if p >= risk_scorer.nlp_threshold]
+
+    entities, sentiments = [], []
+    for i in candidates:
+        doc = nlp(messages[i])
+        entities.append([(ent.text, ent.label_) for ent in doc.ents])
+        sentiments.append(TextBlob(messages[i]).sentiment.polarity)
+    scores = risk_scorer.score([verdicts[i] for i in candidates], sentiments, entities)
+
+    nlp_results = []
+    for i, ents, sentiment, score in zip(candidates, entities, sentiments, scores):
+        if score < risk_scorer.flag_threshold:
+            continue
+        verdict = verdicts[i]
+        nlp_results.append({
+            "message": messages[i],
+            "reason": verdict.reason,
+            "rules": verdict.rules,
+            "spans": verdict.spans(),
+            "entities": ents,
+            "sentiment": sentiment,
+            "score": round(float(score), 4),
+            "rule_version": pack.version
+        })
+    batch_scores = prescores.copy()
+    batch_scores[candidates] = scores
+    return [res["message"] for res in nlp_results], nlp_results, risk_scorer.group_score(batch_scores)
+
+def store_flagged(group_id, nlp_results):
+    # Returns how many flagged messages were new
+    stored = 0
+    for res in nlp_results:
+        existing = supabase.table("group_messages")\
+            .select("message_id")\
+            .eq("group_id", group_id)\
+            .eq("message_text", res["message"])\
+            .eq("flagged_reason", res["reason"])\
+            .execute()
+        if not existing.data:
+            supabase.table("group_messages").insert({
+                "group_id": group_id,
+                "message_text": res["message"],
+                "flagged_reason": res["reason"],
+                "nlp_entities": str(res["entities"]),
+                "sentiment_score": res["sentiment"],
+                "risk_score": res["score"],
+                "rule_version": res["rule_version"]
+            }).execute()
+            stored += 1
+    return stored
+
+def add_scan_counts(group_id, scanned, flagged):
+    # Running totals of messages read and flagged messages stored per group; capacity
+    # eviction ranks groups by their ratio
+    if not scanned and not flagged:
+        return
+    row = supabase.table("groups").select("messages_scanned, flagged_count") \
+        .eq("group_id", group_id).execute().data
+    row = row[0] if row else {}
+    supabase.table("groups").update({
+        "messages_scanned": (row.get("messages_scanned") or 0) + scanned,
+        "flagged_count": (row.get("flagged_count") or 0) + flagged
+    }).eq("group_id", group_id).execute()
+
+def groups_by_key(columns, page_size=1000):
+    # {canonical link key: groups row}; groups.invite_link holds the link as first seen,
+    # so rows are matched on their canonical key rather than the stored string
+    rows, last_id = {}, 0
+    while True:
+        page = supabase.table("groups").select(f"group_id, invite_link, {columns}") \
+            .gt("group_id", last_id).order("group_id").limit(page_size).execute().data or []
+        for row in page:
+            link = canonicalize(row["invite_link"] or "")
+            if link:
+                rows[link.key] = row
+        if len(page) < page_size:
+            return rows
+        last_id = page[-1]["group_id"]
 
 # ------------------ Telegram Scanning Core ------------------
-async def scan_group(invite_link: str):
+# Errors meaning a cached peer can no longer be read (left, kicked, banned, deleted)
+PEER_GONE_ERRORS = (
+    ChannelPrivateError, ChannelInvalidError, ChatForbiddenError,
+    ChatIdInvalidError, PeerIdInvalidError, UserBannedInChannelError
+)
+
+def to_cached_peer(entity, joined):
+    title = getattr(entity, "title", None) or str(entity.id)
+    peer = utils.get_input_peer(entity)
+    if isinstance(peer, InputPeerChannel):
+        return CachedPeer(peer.channel_id, peer.access_hash, "channel", title, joined)
+    if isinstance(peer, InputPeerChat):
+        return CachedPeer(peer.chat_id, 0, "chat", title, joined)
+    return CachedPeer(peer.user_id, peer.access_hash, "user", title, joined)
+
+def to_input_peer(peer):
+    if peer.peer_type == "channel":
+        return InputPeerChannel(peer.id, peer.access_hash)
+    if peer.peer_type == "chat":
+        return InputPeerChat(peer.id)
+    return InputPeerUser(peer.id, peer.access_hash)
+
+async def resolve_group(link, account):
+    # Scans never join. Cached peers skip get_entity entirely; public usernames and
+    # private channel ids are resolved directly, and anything not yet joined is put on
+    # the join queue. Returns None for invite links that cannot be read until joined.
+    client, flood = account.client, account.flood
+    cache_key = account.cache_key(link.key)
+    cached = entity_cache.get(cache_key)
+    if cached and (cached.joined or link.kind != "invite"):
+        return cached
+    if link.kind == "channel":
+        entity = await flood.call("resolve", client.get_entity, int("-100" + link.value))
+        return entity_cache.put(cache_key, to_cached_peer(entity, True))
+
+    # Joins always belong to the group's owner, even when another account is reading it
+    join_queue.enqueue(clients.owner(link.key).name, link.key, link.url)
+    if link.kind == "invite":
+        return None
+    entity = await flood.call("resolve", client.get_entity, link.value)
+    return entity_cache.put(cache_key, to_cached_peer(entity, False))
+
+def forget_peer(account, key):
+    # The account is no longer in this chat (left, evicted or removed): drop the cached
+    # peer and its join-queue row so the next scan resolves and queues it from scratch
+    entity_cache.invalidate(account.cache_key(key))
+    join_queue.forget(account.name, key)
+
+def forget_left(account, entity):
+    for key, peer in entity_cache.items(account.cache_key("")):
+        if peer.id == entity.id:
+            forget_peer(account, key)
+
+def pick_account(link):
+    # The group's owning account. Public usernames can be read without joining, so for
+    # those a history flood wait on the owner fails over to the next account in ring
+    # order; invite and t.me/c links are only readable by the member that joined them.
+    if link.kind != "username":
+        return clients.owner(link.key)
+    return clients.pick(link.key, lambda account: not account.flood.cooldown("history"))
+
+SCAN_WINDOW_HOURS = int(os.getenv("SCAN_WINDOW_HOURS", 24))
+SCAN_MIN_DEPTH = int(os.getenv("SCAN_MIN_DEPTH", 20))
+SCAN_MAX_DEPTH = int(os.getenv("SCAN_MAX_DEPTH", 1000))
+
+def parse_timestamp(value):
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value)
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+def scan_depth(group, now):
+    # How many messages to read: the group's posting velocity times the time since its
+    # last scan, with 50% headroom, clamped to [SCAN_MIN_DEPTH, SCAN_MAX_DEPTH]
+    velocity = (group or {}).get("messages_per_hour")
+    last_scanned_at = parse_timestamp((group or {}).get("last_scanned_at"))
+    if velocity is None or last_scanned_at is None:
+        return 100
+    hours = max((now - last_scanned_at).total_seconds() / 3600, 1)
+    return max(SCAN_MIN_DEPTH, min(SCAN_MAX_DEPTH, math.ceil(velocity * hours * 1.5)))
+
+def posting_velocity(group, new_messages, last_scanned_at, now):
+    # Exponential moving average of messages per hour between scans
+    previous = (group or {}).get("messages_per_hour")
+    if last_scanned_at is None:
+        return previous
+    hours = max((now - last_scanned_at).total_seconds() / 3600, 1 / 60)
+    observed = new_messages / hours
+    return round(observed if previous is None else 0.5 * previous + 0.5 * observed, 3)
+
+def mark_invalid(invite_link):
+    supabase.table("found_links").update({"valid_link": False}).eq("invite_link", invite_link).execute()
+
+def load_group(invite_link):
+    group_record = supabase.table("groups") \
+        .select("group_id, flagged, last_message_id, last_scanned_at, messages_per_hour, risk_score") \
+        .eq("invite_link", invite_link).execute()
+    return group_record.data[0] if group_record.data else None
+
+async def scan_group(invite_link: str, since=None, until=None):
+    link = canonicalize(invite_link)
+    if link is None:
+        print(f"Skipping {invite_link}: not a Telegram group or channel link")
+        await asyncio.to_thread(mark_invalid, invite_link)
+        return None
+    account = pick_account(link)
+    async with account.flood.pipelines:
+        return await scan_group_with(link, invite_link, account, since, until)
+
+async def scan_group_with(link, invite_link, account, since=None, until=None):
+    # since/until bound the scan by message date; by default a group is read back to its
+    # high-water mark, or SCAN_WINDOW_HOURS on the first scan
+    client, flood = account.client, account.flood
     entity = None
     try:
-        if "+" in invite_link:
-            hash_part = invite_link.split("+")[1]
-            try:
-                await client(ImportChatInviteRequest(hash_part))
-                entity = await client.get_entity(invite_link)
-            except UserAlreadyParticipantError:
-                entity = await client.get_entity(invite_link)
-        elif "/joinchat/" in invite_link:
-            username = invite_link.split("/joinchat/")[1]
-            try:
-                await client(ImportChatInviteRequest(username))
-                entity = await client.get_entity(invite_link)
-            except UserAlreadyParticipantError:
-                entity = await client.get_entity(username)
-        elif "/c/" in invite_link:
-            parts = invite_link.split("/")
-            chat_id = int("-100" + parts[-2])
-            entity = await client.get_entity(chat_id)
-        elif "/" in invite_link:
-            username = invite_link.split("/")[-1]
-            try:
-                await client(JoinChannelRequest(username))
-                entity = await client.get_entity(username)
-            except UserAlreadyParticipantError:
-                entity = await client.get_entity(username)
+        entity = await resolve_group(link, account)
     except FloodWaitError as e:
         return {"cooldown": e.seconds, "invite_link": invite_link}
     except Exception as e:
         print(f"Skipping {invite_link} due to error: {e}")
-        supabase.table("found_links").update({"valid_link": False}).eq("invite_link", invite_link).execute()
+        await asyncio.to_thread(mark_invalid, invite_link)
         return None
 
     if not entity:
-        supabase.table("found_links").update({"valid_link": False}).eq("invite_link", invite_link).execute()
-        return None
+        # Private invite: readable only after the join stage has joined it
+        return {"queued": True, "invite_link": invite_link, "account": account.name}
+
+    # Only fetch messages newer than the group's high-water mark, within the time window
+    group = await asyncio.to_thread(load_group, invite_link)
+    last_message_id = (group or {}).get("last_message_id") or 0
+    now = datetime.now(timezone.utc)
+    last_scanned_at = parse_timestamp((group or {}).get("last_scanned_at"))
+    explicit_window = since is not None or until is not None
+    # Naive bounds are UTC; Telethon would read a naive offset_date as server-local time
+    if since and not since.tzinfo:
+        since = since.replace(tzinfo=timezone.utc)
+    if until and not until.tzinfo:
+        until = until.replace(tzinfo=timezone.utc)
+    min_id = 0 if explicit_window else last_message_id
+    if since is None and not last_message_id:
+        since = now - timedelta(hours=SCAN_WINDOW_HOURS)
+    depth = SCAN_MAX_DEPTH if explicit_window else scan_depth(group, now)
+    # From a high-water mark, read oldest-first: a burst larger than depth is carried
+    # over to the next scan instead of skipped when the mark jumps to the newest id
+    reverse = bool(min_id)
+
+    async def read_history():
+        history = []
+        async for msg in client.iter_messages(
+            to_input_peer(entity), limit=depth, min_id=min_id, offset_date=until, reverse=reverse
+        ):
+            if since and msg.date < since:
+                break
+            history.append(msg)
+        return history
 
-    messages = [msg.text for msg in await client.get_messages(entity, limit=100) if msg.text]
+    try:
+        history = await flood.call("history", read_history)
+    except FloodWaitError as e:
+        return {"cooldown": e.seconds, "invite_link": invite_link}
+    except PEER_GONE_ERRORS as e:
+        # Drop the stale peer so the next scan resolves (and rejoins) from scratch
+        print(f"{invite_link} is no longer accessible: {e}")
+        forget_peer(account, link.key)
+        return None
 
-    # ------------------ Pre-NLP filtering ------------------
-    flagged_messages = [
-        msg for msg in messages
-        if any(kw.lower() in msg.lower() for kw in telegram_keywords) or stock_tip_pattern.search(msg)
-    ]
+    if explicit_window:
+        messages_per_hour = (group or {}).get("messages_per_hour")
+    else:
+        messages_per_hour = posting_velocity(group, len(history), last_scanned_at, now)
+
+    if group and not history:
+        await asyncio.to_thread(
+            lambda: supabase.table("groups").update({
+                "messages_per_hour": messages_per_hour,
+                "last_scanned_at": now.isoformat()
+            }).eq("group_id", group["group_id"]).execute()
+        )
+        return {
+            "channel_name": getattr(entity, "title", str(entity.id)),
+            "channel_link": invite_link,
+            "account": account.name,
+            "flagged": bool(group.get("flagged")),
+            "risk_score": group.get("risk_score"),
+            "flagged_messages": [],
+            "nlp_results": []
+        }
+
+    # An explicit since/until window is a one-off look back; it leaves the mark alone
+    if not explicit_window:
+        last_message_id = max([last_message_id] + [msg.id for msg in history])
+    messages = [msg.text for msg in history if msg.text]
+    # NLP and the Supabase writes run off the event loop so concurrent scans overlap
+    return await asyncio.to_thread(
+        record_scan, entity, invite_link, account, group, messages, last_message_id, messages_per_hour, now
+    )
+
+def record_scan(entity, invite_link, account, group, messages, last_message_id, messages_per_hour, now):
+    flagged_messages, nlp_results, batch_risk = analyze_messages(messages)
     flagged = len(flagged_messages) > 0
-
-    # ------------------ NLP analysis ------------------
-    nlp_results = []
-    for msg in flagged_messages:
-        doc = nlp(msg)
-        entities = [(ent.text, ent.label_) for ent in doc.ents]
-        sentiment = TextBlob(msg).sentiment.polarity
-        nlp_results.append({
-            "message": msg,
-            "entities": entities,
-            "sentiment": sentiment
-        })
+    # Moving average, so a group that stops posting tips drifts back down
+    previous_risk = (group or {}).get("risk_score")
+    risk_score = round(batch_risk if previous_risk is None else 0.5 * previous_risk + 0.5 * batch_risk, 4)
 
     # ------------------ Update Supabase ------------------
-    group_record = supabase.table("groups").select("group_id").eq("invite_link", invite_link).execute()
-    if group_record.data:
-        group_id = group_record.data[0]["group_id"]
-        supabase.table("groups").update({
-            "group_name": getattr(entity, "title", str(entity.id)),
-            "member_count": getattr(entity, "participants_count", None),
-            "flagged": flagged,
-            "last_scanned_at": datetime.now(timezone.utc).isoformat()
-        }).eq("group_id", group_id).execute()
+    row = {
+        "group_name": getattr(entity, "title", str(entity.id)),
+        "last_message_id": last_message_id,
+        "messages_per_hour": messages_per_hour,
+        "risk_score": risk_score,
+        "last_scanned_at": now.isoformat()
+    }
+    # Cached peers carry no member count; leave the stored one alone rather than null it
+    member_count = getattr(entity, "participants_count", None)
+    if member_count is not None:
+        row["member_count"] = member_count
+    if group:
+        group_id = group["group_id"]
+        flagged = flagged or bool(group.get("flagged"))
+        supabase.table("groups").update({**row, "flagged": flagged}).eq("group_id", group_id).execute()
     else:
         inserted = supabase.table("groups").insert({
-            "invite_link": invite_link,
-            "group_name": getattr(entity, "title", str(entity.id)),
-            "member_count": getattr(entity, "participants_count", None),
-            "flagged": flagged,
-            "last_scanned_at": datetime.now(timezone.utc).isoformat()
+            **row, "invite_link": invite_link, "flagged": flagged
         }).execute()
         group_id = inserted.data[0]["group_id"]
 
-    for res in nlp_results:
-        reason = "stock_tip_pattern" if stock_tip_pattern.search(res["message"]) else "keyword_match"
-        existing = supabase.table("group_messages")\
-            .select("message_id")\
-            .eq("group_id", group_id)\
-            .eq("message_text", res["message"])\
-            .eq("flagged_reason", reason)\
-            .execute()
-        if not existing.data:
-            supabase.table("group_messages").insert({
-                "group_id": group_id,
-                "message_text": res["message"],
-                "flagged_reason": reason,
-                "nlp_entities": str(res["entities"]),
-                "sentiment_score": res["sentiment"]
-            }).execute()
+    add_scan_counts(group_id, len(messages), store_flagged(group_id, nlp_results))
 
     return {
         "channel_name": getattr(entity, "title", str(entity.id)),
         "channel_link": invite_link,
+        "account": account.name,
         "flagged": flagged,
+        "risk_score": risk_score,
         "flagged_messages": flagged_messages,
         "nlp_results": nlp_results
     }
 
+# ------------------ Join Pipeline ------------------
+JOIN_INTERVAL = int(os.getenv("JOIN_INTERVAL", 300))
+
+# Join errors that mean the link will never work
+DEAD_LINK_ERRORS = (
+    InviteHashExpiredError, InviteHashInvalidError, UsernameNotOccupiedError,
+    UsernameInvalidError, ChannelPrivateError, ChannelInvalidError
+)
+
+async def join_group(account, link):
+    client, flood = account.client, account.flood
+    target = link.url if link.kind == "invite" else link.value
+    request = ImportChatInviteRequest(link.value) if link.kind == "invite" else JoinChannelRequest(link.value)
+    try:
+        updates = await flood.call("join", client, request)
+        chats = getattr(updates, "chats", None)
+        entity = chats[0] if chats else await flood.call("resolve", client.get_entity, target)
+    except UserAlreadyParticipantError:
+        entity = await flood.call("resolve", client.get_entity, target)
+    return entity_cache.put(account.cache_key(link.key), to_cached_peer(entity, True))
+
+# Chats that capacity eviction and bulk leave never touch
+SKIP_GROUPS = [-2300365028]
+
+def is_channel(entity):
+    return getattr(entity, "megagroup", False) or getattr(entity, "broadcast", False)
+
+async def joined_channels(account):
+    dialogs = await account.flood.call("dialogs", account.client.get_dialogs)
+    return [d.entity for d in dialogs if is_channel(d.entity)]
+
+def joined_groups(account, channel_ids, now):
+    # Joined channels this pipeline joined itself (the entity cache knows their link),
+    # with the stats eviction ranks them by. Anything joined by hand is left alone.
+    prefix = account.cache_key("")
+    peers = {
+        key: peer for key, peer in entity_cache.items(prefix)
+        if peer.joined and peer.id in channel_ids and peer.id not in SKIP_GROUPS
+    }
+    if not peers:
+        return []
+    groups = groups_by_key("last_scanned_at, messages_per_hour, messages_scanned, flagged_count")
+    joined_at = join_queue.joined_at(account.name)
+
+    ranked = []
+    for key, peer in peers.items():
+        group = groups.get(key) or {}
+        seen = parse_timestamp(group.get("last_scanned_at"))
+        seen = seen.timestamp() if seen else joined_at.get(key, now)
+        ranked.append(JoinedGroup(
+            key, peer,
+            flag_rate=(group.get("flagged_count") or 0) / max(group.get("messages_scanned") or 0, 1),
+            stale_hours=max(now - seen, 0) / 3600,
+            messages_per_hour=group.get("messages_per_hour") or 0
+        ))
+    return ranked
+
+async def ensure_capacity(account, incoming):
+    # Leave the least valuable groups when joining `incoming` more would hit the channel limit
+    channels = await joined_channels(account)
+    excess = capacity.excess(len(channels), incoming)
+    if not excess:
+        return []
+    groups = await asyncio.to_thread(
+        joined_groups, account, {channel.id for channel in channels}, time.time()
+    )
+    left = []
+    for group in capacity.evictions(groups, excess):
+        try:
+            await leave_channel(account, to_input_peer(group.peer))
+        except FloodWaitError as e:
+            print(f"Leave flood wait on {account.name}: {e.seconds}s, stopping eviction")
+            break
+        except Exception as e:
+            print(f"Could not leave {group.peer.title}: {e}")
+            continue
+        # Evicted links stay out of the join queue, or the next scan would rejoin them
+        entity_cache.invalidate(account.cache_key(group.key))
+        join_queue.evict(account.name, group.key)
+        left.append(group.peer.title)
+    if left:
+        print(f"{account.name} near channel limit ({len(channels)}/{capacity.limit}), left {len(left)}: {left}")
+    return left
+
+async def leave_channel(account, entity):
+    await account.flood.call("leave", account.client, LeaveChannelRequest(entity))
+
+bulk_leave = BulkLeave(leave_channel, concurrency=int(os.getenv("LEAVE_CONCURRENCY", 4)))
+
+async def drain_join_queue(account):
+    # Join pending links for one account until its hourly/daily budget or a flood wait stops it
+    joined = 0
+    pending = join_queue.pending(account.name, join_queue.budget(account.name))
+    if pending:
+        try:
+            await ensure_capacity(account, len(pending))
+        except FloodWaitError as e:
+            print(f"Dialogs flood wait on {account.name}: {e.seconds}s, skipping this round")
+            return joined
+    for key, invite_link in pending:
+        link = canonicalize(invite_link)
+        try:
+            await join_group(account, link)
+        except FloodWaitError as e:
+            join_queue.record(account.name, key, "flood_wait", "pending", f"{e.seconds}s")
+            print(f"Join flood wait on {account.name}: {e.seconds}s, stopping this round")
+            break
+        except InviteRequestSentError:
+            join_queue.record(account.name, key, "requested", "requested")
+            continue
+        except DEAD_LINK_ERRORS as e:
+            join_queue.record(account.name, key, "dead", "failed", str(e))
+            supabase.table("found_links").update({"valid_link": False}).eq("invite_link", invite_link).execute()
+            continue
+        except Exception as e:
+            join_queue.record(account.name, key, "error", "pending", str(e))
+            continue
+        join_queue.record(account.name, key, "joined", "joined")
+        joined += 1
+        print(f"Joined {invite_link} on {account.name}")
+    return joined
+
+async def drain_join_queues():
+    counts = await asyncio.gather(*(drain_join_queue(account) for account in clients))
+    return dict(zip((account.name for account in clients), counts))
+
+async def join_loop():
+    while True:
+        try:
+            await drain_join_queues()
+        except Exception as e:
+            print(f"Join stage failed: {e}")
+        await asyncio.sleep(JOIN_INTERVAL)
+
+# ------------------ History Backfill ------------------
+BACKFILL_CHUNK = int(os.getenv("BACKFILL_CHUNK", 500))
+
+async def backfill_group(link, invite_link):
+    # Full-history scan of one group through the same analysis pipeline as scan_group.
+    # The caller has claimed the (owner, link) checkpoint; it is released on every exit.
+    account = clients.owner(link.key)
+    try:
+        peer = await resolve_group(link, account)
+        if peer is None:
+            print(f"Cannot backfill {invite_link} before {account.name} has joined it")
+            backfills.release(account.name, link.key, "waiting", "not joined yet")
+            return
+        group_id = await asyncio.to_thread(backfill_group_id, invite_link, peer)
+    except Exception as e:
+        print(f"Backfill of {invite_link} stopped: {e}")
+        backfills.release(account.name, link.key, "failed", str(e))
+        return
+
+    def process_chunk(texts):
+        _, nlp_results, _ = analyze_messages(texts)
+        add_scan_counts(group_id, len(texts), store_flagged(group_id, nlp_results) if nlp_results else 0)
+        if nlp_results:
+            supabase.table("groups").update({"flagged": True}).eq("group_id", group_id).execute()
+
+    async def process_chunk_off_loop(chunk):
+        # spaCy/TextBlob and the Supabase writes would otherwise stall the event loop
+        await asyncio.to_thread(process_chunk, [msg.text for msg in chunk if msg.text])
+
+    try:
+        processed = await run_backfill(
+            account, link.key, to_input_peer(peer), backfills, process_chunk_off_loop, chunk_size=BACKFILL_CHUNK
+        )
+        print(f"Backfilled {processed} messages from {invite_link}")
+    except Exception as e:
+        print(f"Backfill of {invite_link} stopped: {e}")
+
+def backfill_group_id(invite_link, peer):
+    group_record = supabase.table("groups").select("group_id").eq("invite_link", invite_link).execute()
+    if group_record.data:
+        return group_record.data[0]["group_id"]
+    return supabase.table("groups").insert({
+        "invite_link": invite_link,
+        "group_name": peer.title,
+        "flagged": False
+    }).execute().data[0]["group_id"]
+
+# ------------------ Live Monitoring ------------------
+# {group_id: [messages read, flagged stored]} since the last monitor flush
+live_counts = {}
+
+async def on_live_message(group_id, message):
+    if not message.text:
+        return
+    counts = live_counts.setdefault(group_id, [0, 0])
+    counts[0] += 1
+    counts[1] += await asyncio.to_thread(record_live_message, group_id, message.text)
+
+def record_live_message(group_id, text):
+    _, nlp_results, _ = analyze_messages([text])
+    if not nlp_results:
+        return 0
+    stored = store_flagged(group_id, nlp_results)
+    supabase.table("groups").update({"flagged": True}).eq("group_id", group_id).execute()
+    print(f"Live flag in group {group_id}: {text[:80]!r}")
+    return stored
+
+def store_high_water(marks):
+    for group_id, (low, high) in marks.items():
+        # Advance only over ids the stream has seen: if messages arrived before the
+        # monitor started (or while it was disconnected) the mark stays put and the
+        # next polling scan reads forward from it
+        supabase.table("groups").update({
+            "last_message_id": high,
+            "last_scanned_at": datetime.now(timezone.utc).isoformat()
+        }).eq("group_id", group_id).gte("last_message_id", low - 1).lt("last_message_id", high).execute()
+        add_scan_counts(group_id, *live_counts.pop(group_id, (0, 0)))
+
+monitor = Monitor(on_live_message, store_high_water, flush_interval=int(os.getenv("MONITOR_FLUSH_INTERVAL", 30)))
+
+def monitored_chats():
+    # {account: {marked peer id: group_id}} for every group an account has joined and
+    # owns, so a group joined by more than one account is still handled once
+    group_ids = {key: row["group_id"] for key, row in groups_by_key("flagged").items()}
+
+    chats = {}
+    for account in clients:
+        chats[account] = {
+            utils.get_peer_id(to_input_peer(peer)): group_ids[key]
+            for key, peer in entity_cache.items(account.cache_key(""))
+            if peer.joined and key in group_ids and clients.owner(key) is account
+        }
+    return chats
+
 # ------------------ FastAPI Endpoints ------------------
 @app.post("/check-single-link")
 async def check_single_link(data: SingleLink):
-    result = await scan_group(data.invite_link)
+    result = await scan_group(data.invite_link, since=data.since, until=data.until)
     if result is None:
         return {"error": "Invalid or unreachable group link."}
     return result
 
 @app.post("/scan-internet")
-async def trigger_scan_internet(background_tasks: BackgroundTasks):
-    background_tasks.add_task(scan_new_groups)
+async def trigger_scan_internet(background_tasks: BackgroundTasks, refresh: list[str] = Query([])):
+    # refresh: keywords whose cached search results should be ignored this run
+    background_tasks.add_task(scan_new_groups, refresh)
     return {"status": "Scanning started"}
 
+@app.post("/backfill")
+async def trigger_backfill(data: SingleLink, background_tasks: BackgroundTasks):
+    link = canonicalize(data.invite_link)
+    if link is None:
+        return {"error": "Not a Telegram group or channel link."}
+    if not backfills.claim(clients.owner(link.key).name, link.key):
+        return {"error": "A backfill of this link is already running."}
+    background_tasks.add_task(backfill_group, link, data.invite_link)
+    return {"status": "Backfill started"}
+
+@app.get("/backfill")
+async def backfill_status():
+    return {"backfills": backfills.all()}
+
+@app.get("/join-queue")
+async def join_queue_status():
+    return join_queue.stats()
+
+@app.post("/join-queue/run")
+async def run_join_queue():
+    return {"joined": await drain_join_queues()}
+
+@app.post("/monitor/start")
+async def start_monitor():
+    chats = await asyncio.to_thread(monitored_chats)
+    count = await monitor.start(chats)
+    return {"status": "Monitoring started", "monitored_groups": count}
+
+@app.post("/monitor/stop")
+async def stop_monitor():
+    await monitor.stop()
+    return {"status": "Monitoring stopped"}
+
+@app.get("/monitor/status")
+async def monitor_status():
+    return monitor.status()
+
 @app.get("/joined-groups-count")
 async def trigger_joined_groups_count():
-    dialogs = await client.get_dialogs()
-    count = sum(1 for d in dialogs if getattr(d.entity, "megagroup", False) or getattr(d.entity, "broadcast", False))
-    return {"joined_groups_count": count}
+    per_account = {}
+    for account in clients:
+        per_account[account.name] = len(await joined_channels(account))
+    return {
+        "joined_groups_count": sum(per_account.values()),
+        "per_account": per_account,
+        "limit": capacity.limit
+    }
+
+@app.post("/capacity/run")
+async def run_capacity():
+    # Evict down to the headroom now instead of waiting for the next join round
+    return {account.name: await ensure_capacity(account, 0) for account in clients}
 
 @app.post("/leave-all-groups")
 async def leave_all_groups():
-    SKIP_GROUPS = [-2300365028]
-    dialogs = await client.get_dialogs()
-    left, skipped = [], []
-    for dialog in dialogs:
-        entity = dialog.entity
-        if entity.id in SKIP_GROUPS:
-            skipped.append({"id": entity.id, "title": getattr(entity, "title", "Unknown")})
-            continue
-        try:
-            await client(LeaveChannelRequest(entity))
-            left.append({"id": entity.id, "title": getattr(entity, "title", "Unknown")})
-        except Exception as e:
-            left.append({"id": entity.id, "title": getattr(entity, "title", "Unknown"), "error": str(e)})
-    return {"left": left, "skipped": skipped}
+    # Starts a background leave job per account; poll GET /leave-all-groups for progress
+    started = {}
+    for account in clients:
+        channels = await joined_channels(account)
+        keep = [c for c in channels if c.id in SKIP_GROUPS]
+        leave = [c for c in channels if c.id not in SKIP_GROUPS]
+        started[account.name] = bulk_leave.start(
+            account, leave, skipped=[describe(c) for c in keep],
+            on_left=forget_left
+        )
+    return {"started": started, "progress": bulk_leave.progress()}
+
+@app.get("/leave-all-groups")
+async def leave_all_groups_status():
+    return {"running": bulk_leave.running(), "progress": bulk_leave.progress()}
+
+def is_unreadable(link, waiting):
+    return link is not None and link.kind == "invite" and link.key in waiting
 
 @app.get("/get-messages")
 async def get_messages(limit: int = Query(5, ge=1, le=100)):
-    results = []
+    results, cooldowns, queued, failed = [], [], [], []
     today = datetime.now(pytz.UTC).date()
 
     # Fetch only links that are marked valid
-    groups = supabase.table("found_links") \
-        .select("found_id, invite_link, last_scanned_at, valid_link") \
-        .eq("valid_link", True) \
+    groups = await asyncio.to_thread(
+        lambda: supabase.table("found_links")
+        .select("found_id, invite_link, last_scanned_at, valid_link")
+        .eq("valid_link", True)
         .execute()
-
-    groups_data = groups.data or []
+    )
+
+    # Private invites not joined (queued or evicted) have nothing to read and would
+    # keep their never-scanned priority, starving the groups that are joined
+    waiting = join_queue.waiting()
+    groups_data = [
+        g for g in groups.data or []
+        if not is_unreadable(canonicalize(g["invite_link"]), waiting)
+    ]
     if not groups_data:
         print("No valid links found to scan.")
         return {"results": []}
@@ -309,33 +911,53 @@ async def get_messages(limit: int = Query(5, ge=1, le=100)):
     else:
         groups_to_scan = groups_data
 
-    for i, group in enumerate(groups_to_scan):
-        if i >= limit:
-            break
-
+    async def scan_one(group):
         invite_link = group["invite_link"]
         print(f"Starting scan for {invite_link}")
-        
         result = await scan_group(invite_link)
-
-        if result:
-            if "cooldown" in result:
-                print(f"Flood detected. Cooldown: {result['cooldown']}s for {invite_link}")
-                return {"cooldown": result["cooldown"], "invite_link": invite_link}
-
+        if result is None:
+            print(f"Skipping {invite_link}, result is None.")
+        elif result.get("queued"):
+            print(f"Waiting for join: {invite_link}")
+            queued.append(invite_link)
+        elif "cooldown" in result:
+            print(f"Flood detected. Cooldown: {result['cooldown']}s for {invite_link}")
+            cooldowns.append(result)
+        else:
             results.append(result)
             print(f"Scanned {invite_link}, flagged={result['flagged']}")
 
-            # Update last scanned timestamp
-            supabase.table("found_links").update({
-                "last_scanned_at": datetime.now(pytz.UTC).isoformat()
-            }).eq("found_id", group["found_id"]).execute()
-        else:
-            print(f"Skipping {invite_link}, result is None.")
-
-        await asyncio.sleep(2)  # small delay to avoid hitting Telegram too fast
-
-    return {"results": results}
+            # Update last scanned timestamp and the link's confidence from the group's risk
+            update = {"last_scanned_at": datetime.now(pytz.UTC).isoformat()}
+            if result.get("risk_score") is not None:
+                update["confidence_score"] = result["risk_score"]
+            await asyncio.to_thread(
+                lambda: supabase.table("found_links").update(update).eq("found_id", group["found_id"]).execute()
+            )
+
+    # Groups are scanned concurrently; a flood wait only defers the groups that hit it,
+    # and an error in one group is reported without discarding the others
+    batch = groups_to_scan[:limit]
+    outcomes = await asyncio.gather(*(scan_one(group) for group in batch), return_exceptions=True)
+    for group, outcome in zip(batch, outcomes):
+        if isinstance(outcome, Exception):
+            print(f"Error scanning {group['invite_link']}: {outcome!r}")
+            failed.append({"invite_link": group["invite_link"], "error": str(outcome)})
+
+    if cooldowns and not results:
+        longest = max(cooldowns, key=lambda c: c["cooldown"])
+        return {"cooldown": longest["cooldown"], "invite_link": longest["invite_link"], "results": []}
+    return {"results": results, "cooldowns": cooldowns, "queued_for_join": queued, "failed": failed}
+
+
+@app.get("/rules")
+async def rules_status():
+    pack = rule_packs.reload()
+    return {"version": pack.version, "rules": [rule.name for rule in pack.engine.rules]}
+
+@app.get("/flood-status")
+async def flood_status():
+    return {account.name: account.flood.stats() for account in clients}
 
 
 # ------------------ Run Server ------------------
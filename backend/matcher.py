@@ -0,0 +1,98 @@
+# matcher.py
+import re
+from typing import NamedTuple
+
+try:
+    import ahocorasick
+except ImportError:  # optional: the trie regex below is used instead
+    ahocorasick = None
+
+
+class Hit(NamedTuple):
+    keyword: str
+    start: int
+    end: int
+
+
+def trie_pattern(words):
+    # One regex for a word list, factored into a trie so shared prefixes are matched
+    # once ("stock", "stocks", "sto" -> "sto(?:ck(?:s)?)?")
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = True
+
+    def emit(node):
+        end = node.get("", False)
+        branches = [re.escape(char) + emit(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if end:
+            return "(?:" + body + ")?"
+        return body
+
+    return emit(trie)
+
+
+def is_word_char(char):
+    return char.isalnum() or char == "_"
+
+
+def lower_in_place(text):
+    # Lowercase without changing the length, so spans in the lowered text are spans in
+    # the original. str.lower() turns a few characters into two ("İ" -> "i̇"); those
+    # keep only their first character.
+    lowered = text.lower()
+    if len(lowered) == len(text):
+        return lowered
+    return "".join(char.lower()[0] for char in text)
+
+
+class KeywordMatcher:
+    # Compiled once per keyword list. find() scans a message once and returns every
+    # whole-word, case-insensitive keyword hit with its span, leftmost-longest and
+    # non-overlapping, so "call" matches "Call now" but not "recall".
+    def __init__(self, keywords):
+        self.keywords = {lower_in_place(kw): kw for kw in keywords if kw}
+        self._automaton = None
+        if ahocorasick is not None and self.keywords:
+            self._automaton = ahocorasick.Automaton()
+            for word in self.keywords:
+                self._automaton.add_word(word, len(word))
+            self._automaton.make_automaton()
+        # Lowercasing once and matching case-sensitively beats re.IGNORECASE
+        pattern = r"(?<!\w)" + trie_pattern(self.keywords) + r"(?!\w)"
+        self._regex = re.compile(pattern) if self.keywords else None
+
+    def find(self, text):
+        if not self.keywords or not text:
+            return []
+        lowered = lower_in_place(text)
+        if self._automaton is None:
+            return [Hit(self.keywords[m.group()], m.start(), m.end()) for m in self._regex.finditer(lowered)]
+
+        hits = []
+        for end, length in self._automaton.iter(lowered):
+            start, end = end - length + 1, end + 1
+            if start > 0 and is_word_char(lowered[start - 1]):
+                continue
+            if end < len(lowered) and is_word_char(lowered[end]):
+                continue
+            hits.append((start, -end))
+        # Leftmost-longest, non-overlapping, like the regex path
+        result, last_end = [], 0
+        for start, neg_end in sorted(hits):
+            if start >= last_end:
+                result.append(Hit(self.keywords[lowered[start:-neg_end]], start, -neg_end))
+                last_end = -neg_end
+        return result
+
+    def search(self, text):
+        if not self.keywords or not text:
+            return False
+        if self._automaton is None:
+            return self._regex.search(lower_in_place(text)) is not None
+        return bool(self.find(text))
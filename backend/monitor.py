@@ -0,0 +1,81 @@
+# monitor.py
+import asyncio
+
+from telethon import events
+
+
+class Monitor:
+    # Streams new messages from joined groups through NewMessage handlers instead of
+    # polling history. on_message(group_id, message) is awaited per message; the
+    # lowest and highest message ids seen per group since the last flush are handed to
+    # on_flush({group_id: (low, high)}) every flush_interval seconds, so the stored mark
+    # only moves to high when it already reaches low - 1 and nothing was skipped.
+    def __init__(self, on_message, on_flush, flush_interval=30):
+        self.on_message = on_message
+        self.on_flush = on_flush
+        self.flush_interval = flush_interval
+        self.running = False
+        self._handlers = []
+        self._high_water = {}
+        self._flusher = None
+        self.received = 0
+        self.monitored = 0
+
+    async def start(self, chats):
+        # chats: {account: {marked peer id: group_id}}
+        if self.running:
+            await self.stop()
+        for account, groups in chats.items():
+            if not groups:
+                continue
+
+            async def handler(event, groups=groups):
+                group_id = groups.get(event.chat_id)
+                if group_id is None:
+                    return
+                self.received += 1
+                low, high = self._high_water.get(group_id, (event.id, event.id))
+                self._high_water[group_id] = (min(low, event.id), max(high, event.id))
+                try:
+                    await self.on_message(group_id, event.message)
+                except Exception as e:
+                    print(f"Monitor failed on message {event.id} in group {group_id}: {e}")
+
+            event = events.NewMessage(chats=list(groups))
+            account.client.add_event_handler(handler, event)
+            self._handlers.append((account, handler, event))
+        self.running = True
+        self.monitored = sum(len(groups) for groups in chats.values())
+        self._flusher = asyncio.create_task(self._flush_loop())
+        return self.monitored
+
+    async def stop(self):
+        for account, handler, event in self._handlers:
+            account.client.remove_event_handler(handler, event)
+        self._handlers = []
+        self.running = False
+        self.monitored = 0
+        if self._flusher:
+            self._flusher.cancel()
+            self._flusher = None
+        await self.flush()
+
+    async def flush(self):
+        marks, self._high_water = self._high_water, {}
+        if marks:
+            await asyncio.to_thread(self.on_flush, marks)
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"Monitor flush failed: {e}")
+
+    def status(self):
+        return {
+            "running": self.running,
+            "monitored_groups": self.monitored,
+            "received": self.received,
+        }
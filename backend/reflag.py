@@ -0,0 +1,125 @@
+# reflag.py
+# Re-evaluates stored group_messages against a rule pack without touching Telegram.
+# Rows are streamed in chunks by message_id, scored on every core from the stored
+# text, sentiment and entities, and only rows whose verdict (flagged reason) changed
+# are written back, tagged with the pack's version. Rows that no longer clear the flag
+# threshold are kept with a null flagged_reason, which readers skip, so a later pack can
+# flag them again; the affected groups get their flagged / flagged_count recomputed.
+# Usage (from backend/): python reflag.py [--rules rules/default.json] [--chunk 1000] [--dry-run]
+import argparse
+import ast
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from dotenv import load_dotenv
+from supabase import create_client
+
+from rules import load_rule_pack
+
+COLUMNS = "message_id, group_id, message_text, flagged_reason, nlp_entities, sentiment_score, risk_score, rule_version"
+
+pack = None
+
+
+def init_worker(path):
+    global pack
+    pack = load_rule_pack(path)
+
+
+def parse_entities(value):
+    try:
+        return [tuple(ent) for ent in ast.literal_eval(value or "[]")]
+    except (ValueError, SyntaxError, TypeError):
+        return []
+
+
+def reflag_rows(rows):
+    # Rows whose verdict changed, with their new reason (None: no longer flagged)
+    verdicts = [pack.engine.evaluate(row["message_text"] or "") for row in rows]
+    scores = pack.scorer.score(
+        verdicts,
+        [row["sentiment_score"] or 0 for row in rows],
+        [parse_entities(row["nlp_entities"]) for row in rows],
+    )
+    changed = []
+    for row, verdict, score in zip(rows, verdicts, scores):
+        reason = verdict.reason if score >= pack.scorer.flag_threshold else None
+        if reason == row["flagged_reason"]:
+            continue
+        changed.append({
+            **row,
+            "flagged_reason": reason,
+            "risk_score": round(float(score), 4),
+            "rule_version": pack.version,
+        })
+    return changed
+
+
+def recount_group(supabase, group_id):
+    # A group stays flagged only while it still has flagged messages
+    remaining = supabase.table("group_messages").select("message_id", count="exact", head=True) \
+        .eq("group_id", group_id).not_.is_("flagged_reason", "null").execute().count or 0
+    supabase.table("groups").update({
+        "flagged": remaining > 0,
+        "flagged_count": remaining
+    }).eq("group_id", group_id).execute()
+
+
+def stream_rows(supabase, chunk_size):
+    # Keyset pagination on message_id, so rows updated mid-run are neither skipped nor repeated
+    last_id = 0
+    while True:
+        rows = supabase.table("group_messages").select(COLUMNS) \
+            .gt("message_id", last_id).order("message_id").limit(chunk_size).execute().data or []
+        if rows:
+            yield rows
+            last_id = rows[-1]["message_id"]
+        if len(rows) < chunk_size:
+            break
+
+
+def main(rules_path, chunk_size=1000, workers=None, dry_run=False):
+    load_dotenv()
+    supabase = create_client(os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_SERVICE_ROLE_KEY"))
+    version = load_rule_pack(rules_path).version
+    workers = workers or os.cpu_count() or 2
+    scanned = changed = cleared = 0
+    affected = set()
+
+    def write(rows):
+        nonlocal changed, cleared
+        changed += len(rows)
+        cleared += sum(row["flagged_reason"] is None for row in rows)
+        # Any row that was cleared or flagged again moves its group's count
+        affected.update(row["group_id"] for row in rows)
+        if rows and not dry_run:
+            supabase.table("group_messages").upsert(rows, on_conflict="message_id").execute()
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(rules_path,)) as pool:
+        # Keep every core busy while the next chunk is fetched, without buffering the table
+        in_flight = []
+        for rows in stream_rows(supabase, chunk_size):
+            scanned += len(rows)
+            in_flight.append(pool.submit(reflag_rows, rows))
+            if len(in_flight) >= workers * 2:
+                write(in_flight.pop(0).result())
+        for future in in_flight:
+            write(future.result())
+
+    if not dry_run:
+        for group_id in affected:
+            recount_group(supabase, group_id)
+
+    action = "would change" if dry_run else "changed"
+    print(f"Rule pack {version}: scanned {scanned} messages, {action} {changed} ({cleared} no longer flagged)")
+    return scanned, changed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rules", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "rules", "default.json"))
+    parser.add_argument("--chunk", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+    main(args.rules, args.chunk, args.workers, args.dry_run)
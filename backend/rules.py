@@ -0,0 +1,136 @@
+# rules.py
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from typing import NamedTuple, Optional, Tuple
+
+from matcher import KeywordMatcher
+from scoring import RiskScorer
+
+
+class Rule(NamedTuple):
+    name: str  # stored as group_messages.flagged_reason when it is the primary reason
+    keywords: Tuple[str, ...] = ()
+    pattern: Optional[str] = None
+    flags: int = re.IGNORECASE
+
+
+class RuleHit(NamedTuple):
+    rule: str
+    start: int
+    end: int
+    text: str
+
+
+class Verdict(NamedTuple):
+    hits: Tuple[RuleHit, ...]
+    reason: Optional[str]  # highest-priority rule that fired
+
+    @property
+    def flagged(self):
+        return bool(self.hits)
+
+    @property
+    def rules(self):
+        return sorted({hit.rule for hit in self.hits})
+
+    def spans(self):
+        return [[hit.rule, hit.start, hit.end] for hit in self.hits]
+
+
+class RuleEngine:
+    # Compiles every rule once: all keyword lists go into one KeywordMatcher, so the
+    # keywords are read in a single pass however many rules there are. Each regex runs
+    # on its own, since an alternation would report only the first of two patterns
+    # matching at the same place. Rules are listed in priority order; the first one
+    # that fires is the verdict's reason.
+    def __init__(self, rules):
+        self.rules = list(rules)
+        self._priority = {rule.name: i for i, rule in enumerate(self.rules)}
+        self._keyword_rules = {}
+        for rule in self.rules:
+            for kw in rule.keywords:
+                self._keyword_rules.setdefault(kw.lower(), []).append(rule.name)
+        self._keywords = KeywordMatcher(list(self._keyword_rules))
+        self._regexes = [
+            (rule.name, re.compile(rule.pattern, rule.flags)) for rule in self.rules if rule.pattern
+        ]
+
+    def evaluate(self, text):
+        hits = []
+        if text:
+            for hit in self._keywords.find(text):
+                for rule in self._keyword_rules[hit.keyword.lower()]:
+                    hits.append(RuleHit(rule, hit.start, hit.end, text[hit.start:hit.end]))
+            for name, regex in self._regexes:
+                for m in regex.finditer(text):
+                    hits.append(RuleHit(name, m.start(), m.end(), m.group()))
+        hits.sort(key=lambda hit: (hit.start, hit.end))
+        reason = min((hit.rule for hit in hits), key=self._priority.get, default=None)
+        return Verdict(tuple(hits), reason)
+
+
+class RulePack(NamedTuple):
+    version: str
+    engine: RuleEngine
+    scorer: RiskScorer
+
+
+def load_rule_pack(path):
+    # A JSON rule pack: {"version", "rules": [{"name", "keywords" | "pattern", "weight"}],
+    # "scoring": {RiskScorer options}}. Rules are listed in priority order. The pack's
+    # version is its "version" field plus a hash of the file, so an edit that forgets to
+    # bump the field still gets a new version (and rows stamped with it stay traceable).
+    with open(path, "rb") as f:
+        raw = f.read()
+    data = json.loads(raw)
+    rules = [
+        Rule(r["name"], keywords=tuple(r.get("keywords", ())), pattern=r.get("pattern"))
+        for r in data["rules"]
+    ]
+    weights = {r["name"]: float(r.get("weight", 1.0)) for r in data["rules"]}
+    digest = hashlib.sha1(raw).hexdigest()[:12]
+    return RulePack(
+        f"{data['version']}+{digest}" if data.get("version") else digest,
+        RuleEngine(rules),
+        RiskScorer(weights, **data.get("scoring", {})),
+    )
+
+
+class RulePacks:
+    # The live rule pack, recompiled when its file changes. current() checks the file's
+    # mtime at most every check_interval seconds; a new pack is compiled before it
+    # replaces the old one, so callers always see a whole pack. Callers should take
+    # current() once per batch. A pack that fails to load is reported and skipped.
+    def __init__(self, path, check_interval=5):
+        self.path = path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._mtime = os.stat(path).st_mtime_ns
+        self._pack = load_rule_pack(path)
+        self._checked_at = time.monotonic()
+
+    def current(self):
+        if time.monotonic() - self._checked_at >= self.check_interval:
+            self.reload()
+        return self._pack
+
+    def reload(self, force=False):
+        with self._lock:
+            self._checked_at = time.monotonic()
+            try:
+                mtime = os.stat(self.path).st_mtime_ns
+                if mtime == self._mtime and not force:
+                    return self._pack
+                self._mtime = mtime
+                pack = load_rule_pack(self.path)
+            except (OSError, ValueError, KeyError, TypeError, re.error) as e:
+                print(f"Keeping rule pack {self._pack.version}: cannot load {self.path}: {e}")
+                return self._pack
+            if pack.version != self._pack.version:
+                print(f"Rule pack {self._pack.version} -> {pack.version}")
+            self._pack = pack
+            return pack
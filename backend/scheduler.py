@@ -0,0 +1,71 @@
+# scheduler.py
+import asyncio
+import time
+
+from telethon.errors import FloodWaitError
+
+
+class RequestClass:
+    # Pacing state for one kind of Telegram request ("join", "resolve", "history", ...)
+    def __init__(self, delay):
+        self.delay = delay
+        self.next_at = 0.0
+        self.paused_until = 0.0
+        self.floods = 0
+        self.lock = asyncio.Lock()
+
+
+class FloodScheduler:
+    # Spaces Telegram calls per request class and adapts the spacing to observed
+    # FloodWaitErrors: the delay doubles on every flood and decays on success.
+    # A flood wait pauses only its own class; short waits are slept out and retried,
+    # longer ones are re-raised so the caller can report a cooldown.
+    def __init__(self, concurrency=4, min_delay=0.2, max_delay=30.0, max_wait=60):
+        self.pipelines = asyncio.Semaphore(concurrency)
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.max_wait = max_wait
+        self._classes = {}
+
+    def _class(self, kind):
+        rc = self._classes.get(kind)
+        if rc is None:
+            rc = self._classes[kind] = RequestClass(self.min_delay)
+        return rc
+
+    def cooldown(self, kind):
+        # Seconds left on a flood wait for this request class
+        return max(0.0, self._class(kind).paused_until - time.monotonic())
+
+    def stats(self):
+        return {
+            kind: {"delay": round(rc.delay, 2), "floods": rc.floods, "cooldown": round(self.cooldown(kind))}
+            for kind, rc in self._classes.items()
+        }
+
+    async def _wait_turn(self, rc):
+        async with rc.lock:
+            now = time.monotonic()
+            wait = max(rc.paused_until, rc.next_at) - now
+            if wait > 0:
+                await asyncio.sleep(wait)
+            rc.next_at = max(now, rc.next_at) + rc.delay
+
+    async def call(self, kind, fn, *args, **kwargs):
+        rc = self._class(kind)
+        while True:
+            if self.cooldown(kind) > self.max_wait:
+                raise FloodWaitError(request=None, capture=int(self.cooldown(kind)))
+            await self._wait_turn(rc)
+            try:
+                result = await fn(*args, **kwargs)
+            except FloodWaitError as e:
+                rc.floods += 1
+                rc.delay = min(self.max_delay, rc.delay * 2)
+                rc.paused_until = max(rc.paused_until, time.monotonic() + e.seconds)
+                print(f"FloodWaitError on {kind}: {e.seconds}s, pacing now {rc.delay:.1f}s")
+                if e.seconds > self.max_wait:
+                    raise
+                continue
+            rc.delay = max(self.min_delay, rc.delay * 0.9)
+            return result
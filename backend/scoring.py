@@ -0,0 +1,71 @@
+# scoring.py
+import numpy as np
+
+# spaCy entity labels typical of tips: prices, targets, percentages, listed companies
+TIP_ENTITY_LABELS = {"MONEY", "PERCENT", "CARDINAL", "ORG"}
+
+
+class RiskScorer:
+    # Logistic risk score per message, computed for a whole batch at once:
+    #   score = sigmoid(bias + sum(rule_weight * log1p(distinct hits per rule))
+    #                   + sentiment_weight * positive polarity
+    #                   + entity_weight * log1p(tip-like entities))
+    # prescore() uses the rule features only and decides which messages are worth NLP;
+    # score() adds the NLP features, and messages at or above flag_threshold are flagged.
+    def __init__(self, rule_weights, bias=-3.0, sentiment_weight=1.0, entity_weight=0.75,
+                 nlp_threshold=0.2, flag_threshold=0.5):
+        self.rules = list(rule_weights)
+        self.weights = np.array(
+            [rule_weights[rule] for rule in self.rules] + [sentiment_weight, entity_weight], dtype=np.float64
+        )
+        self.bias = bias
+        self.nlp_threshold = nlp_threshold
+        self.flag_threshold = flag_threshold
+        self._columns = {rule: i for i, rule in enumerate(self.rules)}
+
+    @property
+    def prior(self):
+        # Score of a message (or group) with no evidence at all
+        return float(1 / (1 + np.exp(-self.bias)))
+
+    def features(self, verdicts, sentiments=None, entities=None):
+        n = len(verdicts)
+        x = np.zeros((n, len(self.rules) + 2), dtype=np.float64)
+        for i, verdict in enumerate(verdicts):
+            distinct = {(hit.rule, hit.text.lower()) for hit in verdict.hits}
+            for rule, _ in distinct:
+                column = self._columns.get(rule)
+                if column is not None:
+                    x[i, column] += 1
+        x[:, :len(self.rules)] = np.log1p(x[:, :len(self.rules)])
+        if sentiments is not None:
+            x[:, -2] = np.clip(np.asarray(sentiments, dtype=np.float64), 0, None)
+        if entities is not None:
+            x[:, -1] = np.log1p([
+                sum(1 for _, label in ents if label in TIP_ENTITY_LABELS) for ents in entities
+            ])
+        return x
+
+    def _sigmoid(self, x):
+        return 1 / (1 + np.exp(-(x @ self.weights + self.bias)))
+
+    def prescore(self, verdicts):
+        if not verdicts:
+            return np.zeros(0)
+        return self._sigmoid(self.features(verdicts))
+
+    def score(self, verdicts, sentiments, entities):
+        if not verdicts:
+            return np.zeros(0)
+        return self._sigmoid(self.features(verdicts, sentiments, entities))
+
+    def group_score(self, scores):
+        # Noisy-OR over the flagged messages: several independent tips push the group
+        # towards 1. A group with no flagged message scores its riskiest message.
+        scores = np.asarray(scores, dtype=np.float64)
+        if not scores.size:
+            return 0.0
+        flagged = scores[scores >= self.flag_threshold]
+        if not flagged.size:
+            return float(scores.max())
+        return float(1 - np.prod(1 - flagged))
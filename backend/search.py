@@ -0,0 +1,50 @@
+# search.py
+import asyncio
+from urllib.parse import urldefrag
+
+from ddgs import DDGS
+
+from ratelimit import TokenBucket
+
+
+def fetch_search_results(query, max_results=10):
+    urls = []
+    with DDGS() as ddgs:
+        for r in ddgs.text(query, max_results=max_results):
+            urls.append(r["href"])
+    return urls
+
+
+async def search_fan_out(queries, max_results=5, qps=1.0, concurrency=4, cache=None, refresh=()):
+    # Run all queries concurrently under a queries-per-second budget and return
+    # {url: first query that produced it}, so each result page is crawled once.
+    # Cached results are reused unless the query is listed in `refresh`.
+    bucket = TokenBucket(qps)
+    slots = asyncio.Semaphore(concurrency)
+    refresh = set(refresh)
+
+    async def run(query):
+        if cache and query not in refresh:
+            urls = cache.get(query, max_results)
+            if urls is not None:
+                print(f"Cached search: {query}")
+                return urls
+        async with slots:
+            await bucket.acquire()
+            print(f"Searching: {query}")
+            try:
+                urls = await asyncio.to_thread(fetch_search_results, query, max_results)
+            except Exception as e:
+                print(f"Search failed for {query}: {e}")
+                return []
+        if cache:
+            cache.put(query, max_results, urls)
+        return urls
+
+    results = await asyncio.gather(*(run(q) for q in queries))
+
+    found = {}
+    for query, urls in zip(queries, results):
+        for url in urls:
+            found.setdefault(urldefrag(url).url, query)
+    return found
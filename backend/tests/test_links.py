@@ -0,0 +1,92 @@
+# test_links.py
+# Run from backend/: python -m pytest tests
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from links import InviteLink, LinkIndex, canonicalize, extract_page_links, extract_telegram_links
+
+
+@pytest.mark.parametrize("link", [
+    "https://t.me/stocktips",
+    "http://t.me/stocktips",
+    "https://t.me/stocktips/",
+    "t.me/stocktips",
+    "//t.me/stocktips",
+    "https://www.t.me/stocktips",
+    "https://telegram.me/stocktips",
+    "https://t.me/s/stocktips",
+    "https://t.me/StockTips",
+    "https://t.me/stocktips/1234",
+    "https://t.me/stocktips?start=abc",
+    "  https://t.me/stocktips  ",
+])
+def test_username_variants_share_one_key(link):
+    assert canonicalize(link) == InviteLink("username", "stocktips")
+
+
+@pytest.mark.parametrize("link", [
+    "https://t.me/+AbCdEf123456_-xy",
+    "https://t.me/joinchat/AbCdEf123456_-xy",
+    "http://t.me/joinchat/AbCdEf123456_-xy/",
+    "https://telegram.me/joinchat/AbCdEf123456_-xy",
+])
+def test_invite_variants_share_one_key(link):
+    assert canonicalize(link) == InviteLink("invite", "AbCdEf123456_-xy")
+
+
+def test_invite_hash_keeps_case():
+    assert canonicalize("https://t.me/+AbCdEf123456").key != canonicalize("https://t.me/+abcdef123456").key
+
+
+def test_private_channel_link():
+    assert canonicalize("https://t.me/c/1234567890/55") == InviteLink("channel", "1234567890")
+
+
+@pytest.mark.parametrize("link", [
+    "https://t.me/+14155552671",  # phone number, not an invite
+    "https://t.me/+919876543210",
+    "https://t.me/joinchat/",
+    "https://t.me/+short",
+    "https://t.me/c/notanid",
+    "https://t.me/",
+    "https://t.me/share/url?url=x",
+    "https://t.me/addstickers/pack",
+    "https://t.me/proxy?server=1",
+    "https://t.me/abc",  # too short for a username
+    "https://t.me/1stock",  # usernames start with a letter
+    "//tttttt.me/s/stocktips",
+    "https://example.com/stocktips",
+    "not a link",
+])
+def test_junk_and_non_group_links(link):
+    assert canonicalize(link) is None
+
+
+def test_canonical_url_round_trips():
+    for link in ["https://t.me/s/StockTips", "https://t.me/joinchat/AbCdEf123456", "https://t.me/c/123/4"]:
+        canonical = canonicalize(link)
+        assert canonicalize(canonical.url) == canonical
+
+
+def test_extract_telegram_links_skips_lookalike_hosts():
+    page = b'<a href="https://t.me/stocktips">x</a> //tttttt.me/s/other t.me/+AbCdEf123456.'
+    links = {canonicalize(link) for link in extract_telegram_links(page)}
+    assert links == {InviteLink("username", "stocktips"), InviteLink("invite", "AbCdEf123456")}
+
+
+def test_extract_page_links_drops_malformed_urls():
+    page = b'<a href="/next">n</a><a href="http://localhost:99999/">p</a><a href="http://[::1/">v</a>'
+    assert extract_page_links(page, "https://a.example/") == ["https://a.example/next"]
+
+
+def test_link_index_persists(tmp_path):
+    path = str(tmp_path / "known_links.txt")
+    index = LinkIndex(path)
+    assert index.add("username:a", "invite:B", "username:a") == ["username:a", "invite:B"]
+    assert index.add("username:a") == []
+    reloaded = LinkIndex(path)
+    assert len(reloaded) == 2 and "invite:B" in reloaded
@@ -0,0 +1,69 @@
+# test_matcher.py
+# Run from backend/: python -m pytest tests
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import matcher
+from matcher import Hit, KeywordMatcher, trie_pattern
+
+KEYWORDS = ["call", "stock", "stocks", "stock tips", "SEBI", "buy", "tip", "nifty"]
+
+
+def engines():
+    # The pure-regex matcher always; the Aho-Corasick one when pyahocorasick is installed
+    regex = KeywordMatcher(KEYWORDS)
+    regex._automaton = None
+    found = [("regex", regex)]
+    if matcher.ahocorasick is not None:
+        found.append(("automaton", KeywordMatcher(KEYWORDS)))
+    return found
+
+
+@pytest.fixture(params=engines(), ids=lambda engine: engine[0])
+def keywords(request):
+    return request.param[1]
+
+
+def test_trie_pattern_factors_prefixes():
+    assert trie_pattern(["stock", "stocks", "sto"]) == "sto(?:ck(?:s)?)?"
+
+
+def test_word_boundaries(keywords):
+    assert keywords.find("Please recall the stock") == [Hit("stock", 18, 23)]
+    assert keywords.find("BUY now, call!") == [Hit("buy", 0, 3), Hit("call", 9, 13)]
+    assert keywords.find("stocks_x restocks callback") == []
+    assert not keywords.search("recall")
+
+
+def test_longest_match_wins(keywords):
+    assert keywords.find("stock tips here") == [Hit("stock tips", 0, 10)]
+    assert keywords.find("sebi-registered") == [Hit("SEBI", 0, 4)]
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("TİP of the day", [Hit("tip", 0, 3)]),
+    ("BUY NİFTY now", [Hit("buy", 0, 3), Hit("nifty", 4, 9)]),
+    ("İİİ call", [Hit("call", 4, 8)]),
+])
+def test_text_that_grows_when_lowercased(keywords, text, expected):
+    # "İ".lower() is two characters; spans must still index the original text
+    assert keywords.find(text) == expected
+    assert keywords.search(text)
+
+
+@pytest.mark.skipif(matcher.ahocorasick is None, reason="pyahocorasick not installed")
+def test_automaton_and_regex_agree():
+    rng = random.Random(3)
+    vocabulary = KEYWORDS + ["recall", "tips", "Stock", "İ", "calls", "_buy", "buy_", "x"]
+    regex = KeywordMatcher(KEYWORDS)
+    regex._automaton = None
+    automaton = KeywordMatcher(KEYWORDS)
+    for _ in range(2000):
+        text = rng.choice([" ", "-", ", "]).join(rng.choices(vocabulary, k=rng.randint(1, 8)))
+        assert automaton.find(text) == regex.find(text), text
+        assert automaton.search(text) == regex.search(text), text
@@ -0,0 +1,63 @@
+# test_rules.py
+# Run from backend/: python -m pytest tests
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rules import Rule, RuleEngine, load_rule_pack
+
+DEFAULT_PACK = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "rules", "default.json")
+
+
+def test_overlapping_patterns_all_fire():
+    engine = RuleEngine([
+        Rule("buy_call", pattern=r"buy\s+\w+"),
+        Rule("buy_at_price", pattern=r"buy\s+\w+\s+at\s+\d+"),
+    ])
+    verdict = engine.evaluate("Buy RELIANCE at 2450")
+    assert verdict.rules == ["buy_at_price", "buy_call"]
+    assert verdict.reason == "buy_call"
+    assert verdict.spans() == [["buy_call", 0, 12], ["buy_at_price", 0, 20]]
+
+
+def test_reason_follows_rule_order():
+    engine = RuleEngine([
+        Rule("pattern", pattern=r"target\s+\d+"),
+        Rule("keywords", keywords=("target",)),
+    ])
+    verdict = engine.evaluate("target 120 soon")
+    assert verdict.reason == "pattern"
+    assert verdict.rules == ["keywords", "pattern"]
+
+
+def test_keyword_shared_by_rules():
+    engine = RuleEngine([Rule("a", keywords=("SEBI",)), Rule("b", keywords=("sebi",))])
+    verdict = engine.evaluate("not sebi registered")
+    assert [hit.rule for hit in verdict.hits] == ["a", "b"]
+    assert {hit.text for hit in verdict.hits} == {"sebi"}
+
+
+def test_no_hits():
+    verdict = RuleEngine([Rule("k", keywords=("tip",))]).evaluate("nothing to see")
+    assert not verdict.flagged
+    assert verdict.reason is None
+    assert RuleEngine([]).evaluate("").hits == ()
+
+
+def test_default_pack_matches_inflections():
+    pack = load_rule_pack(DEFAULT_PACK)
+    verdict = pack.engine.evaluate("Daily tips, intraday calls and signals")
+    assert [hit.text for hit in verdict.hits] == ["tips", "intraday", "calls", "signals"]
+
+
+def test_version_tracks_content(tmp_path):
+    path = tmp_path / "pack.json"
+    path.write_text('{"version": "1", "rules": [{"name": "k", "keywords": ["tip"]}]}')
+    first = load_rule_pack(str(path)).version
+    path.write_text('{"version": "1", "rules": [{"name": "k", "keywords": ["tips"]}]}')
+    second = load_rule_pack(str(path)).version
+    assert first.startswith("1+") and second.startswith("1+")
+    assert first != second
+    path.write_text('{"rules": [{"name": "k", "keywords": ["tip"]}]}')
+    assert "+" not in load_rule_pack(str(path)).version
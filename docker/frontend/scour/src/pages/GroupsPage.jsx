@@ -45,7 +45,7 @@ function GroupsPage() {
           flagged_reason,
           created_at
         )
-      `);
+      `).not("group_messages.flagged_reason", "is", null);
 
       if (!error) setGroups(data);
       else console.error(error);
@@ -48,9 +48,11 @@ export default function Dashboard() {
         const maliciousGroups = allGroups.filter((g) => g.flagged).length;
 
         // Fetch flagged messages
+        // Rows cleared by a re-flag keep a null flagged_reason
         const { data: flaggedMsgs, error: msgError } = await supabase
           .from("group_messages")
-          .select("*");
+          .select("*")
+          .not("flagged_reason", "is", null);
 
         if (msgError) throw msgError;
 
@@ -62,7 +64,8 @@ export default function Dashboard() {
             const { data: msgs } = await supabase
               .from("group_messages")
               .select("*")
-              .eq("group_id", g.group_id);
+              .eq("group_id", g.group_id)
+              .not("flagged_reason", "is", null);
             return {
               name: g.group_name,
               flaggedMessages: msgs?.length || 0,